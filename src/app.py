@@ -1,7 +1,8 @@
 import os
 import dash
+import diskcache
 import dash_bootstrap_components as dbc
-from dash import dcc, html
+from dash import dcc, html, DiskcacheManager
 from dash.dependencies import Input, Output
 from layouts.forecast import layout as forecast_layout
 from layouts.home import layout as home_layout
@@ -10,13 +11,20 @@ from layouts.about import layout as about_layout
 from layouts.terms import layout as terms_layout
 from callbacks.forecast_callbacks import register_callbacks as forecast_callbacks
 from callbacks.news_callbacks import register_callbacks as news_callbacks
+from models.utils import DATA_DIR
+from helpers.forecast_helpers import price_history_cache, stock_info_cache, training_executor, compute_budget
+from helpers import result_store, serialization
 
 # External stylesheets
 external_stylesheets = [dbc.themes.BOOTSTRAP]
 
+# Long-running callbacks such as forecasts run in background processes, their state lives in a local disk cache
+background_callback_manager = DiskcacheManager(diskcache.Cache(os.path.join(DATA_DIR, 'callbacks')))
+
 # Initialize Dash app
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets, background_callback_manager=background_callback_manager)
 server = app.server
+serialization.register_server_timing(server)
 app.title = "TrendAnalyzer"
 app._favicon = 'assets/favicon.ico'
 
@@ -114,6 +122,22 @@ def display_page(pathname):
     else:
         return "404 Page Not Found"
 
+@server.route('/cache-stats')
+def cache_stats():
+    return {
+        'price_history': price_history_cache.stats(),
+        'stock_info': stock_info_cache.stats(),
+        'forecast_results': result_store.stats()
+    }
+
+@server.route('/training-stats')
+def training_stats():
+    return dict(training_executor.stats(), compute=compute_budget.stats())
+
+@server.route('/timing-stats')
+def timing_stats():
+    return serialization.stats()
+
 forecast_callbacks(app)
 news_callbacks(app)
 
@@ -0,0 +1,57 @@
+# Precomputes the forecast page for the whole watchlist into the result store, so clicks on the page are lookups.
+# Run from the src directory, e.g. nightly after the close: python batch_forecast.py [--tickers AAPL MSFT] [--workers 4]
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from layouts.forecast import TICKERS, FORECAST_PERIODS
+from models.utils import download_data
+from helpers.forecast_helpers import load_or_compute_forecast, calculate_recommendations, training_executor
+
+MODEL_TYPES = ['XGBoost', 'Prophet']
+
+def precompute(ticker, model_types, periods, earnings_percentage):
+    rows = []
+    try:
+        data = download_data(ticker)
+    except Exception as e:
+        return [(ticker, None, None, 'failed', 0, f"download: {e}")]
+
+    for model_type in model_types:
+        for forecast_days in periods:
+            start = time.time()
+            try:
+                # Only results for these exact prices are reused, the run is what keeps the store fresh
+                result = load_or_compute_forecast(data, ticker, model_type, forecast_days, max_age=0)
+                status = 'computed' if result.get('computed_at', 0) >= start else 'stored'
+                _, _, sell_date, sell_price = calculate_recommendations(data, model_type, result['forecast_data'], earnings_percentage)
+                detail = f"sell {sell_price} on {sell_date}" if sell_price != 'N/A' else sell_date
+            except Exception as e:
+                # One failing ticker or model must not end the run
+                status, detail = 'failed', f"{type(e).__name__}: {e}"
+            rows.append((ticker, model_type, forecast_days, status, time.time() - start, detail))
+    return rows
+
+def run(tickers, model_types, periods, workers, earnings_percentage):
+    # Each ticker downloads once and trains its models in the training executor, workers tickers at a time
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(precompute, ticker, model_types, periods, earnings_percentage) for ticker in tickers]
+        rows = [row for future in futures for row in future.result()]
+
+    print(f"{'Ticker':<8}{'Model':<9}{'Days':>5}  {'Status':<10}{'Seconds':>8}  Recommendation")
+    for ticker, model_type, forecast_days, status, seconds, detail in rows:
+        print(f"{ticker:<8}{model_type or '-':<9}{forecast_days or '-':>5}  {status:<10}{seconds:>8.2f}  {detail}")
+    failed = sum(row[3] == 'failed' for row in rows)
+    print(f"\n{len(rows) - failed} forecasts ready, {failed} failed in {time.time() - start:.1f}s")
+    return failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute watchlist forecasts into the result store')
+    parser.add_argument('--tickers', nargs='+', default=TICKERS)
+    parser.add_argument('--models', nargs='+', default=MODEL_TYPES, choices=MODEL_TYPES)
+    parser.add_argument('--days', nargs='+', type=int, default=list(FORECAST_PERIODS))
+    parser.add_argument('--workers', type=int, default=max(1, training_executor.max_workers))
+    parser.add_argument('--earnings', type=float, default=10, help='Earnings target in percent for the summary')
+    args = parser.parse_args()
+    sys.exit(1 if run(args.tickers, args.models, args.days, args.workers, args.earnings) else 0)
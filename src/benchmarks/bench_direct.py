@@ -0,0 +1,42 @@
+# Compares forecast latency of the recursive, rolling and direct multi-horizon XGBoost forecasts.
+# Run from the src directory: python -m benchmarks.bench_direct [--horizons 7 30 90] [--seed 0]
+import argparse
+import copy
+import time
+from benchmarks.synthetic import random_walk_prices
+from models.xgboost_model import prepare_and_train_model, forecast_without_rolling, forecast_with_rolling, train_direct_model, forecast_direct
+
+def timed(call, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(horizons, seed, n_days, repeat):
+    data = random_walk_prices(n_days, seed)
+
+    start = time.perf_counter()
+    train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test = prepare_and_train_model(data.copy())
+    print(f"Recursive/rolling model trained in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    direct_model = train_direct_model(train_df, test_df)
+    print(f"Direct model trained in {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'Horizon':<9}{'recursive ms':>14}{'rolling ms':>14}{'direct ms':>12}")
+    for days in horizons:
+        recursive = timed(lambda: forecast_without_rolling(best_model, test_df, scaler, feature_cols, y_test, y_pred_test, forecast_days=days), repeat)
+        # The rolling forecast refits its model and scaler in place
+        rolling = timed(lambda: forecast_with_rolling(copy.deepcopy(best_model), train_df, test_df, feature_cols, copy.deepcopy(scaler), forecast_days=days), 1)
+        direct = timed(lambda: forecast_direct(direct_model, train_df, test_df, forecast_days=days), repeat)
+        print(f"{days:<9}{recursive * 1e3:>14.1f}{rolling * 1e3:>14.1f}{direct * 1e3:>12.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark direct multi-horizon forecasts against the recursive ones')
+    parser.add_argument('--horizons', nargs='+', type=int, default=[7, 30, 90])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.horizons, args.seed, args.days, args.repeat)
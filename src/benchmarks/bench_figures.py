@@ -0,0 +1,65 @@
+# Measures the forecast figures sent to the browser with and without LTTB downsampling of the history traces.
+# Run from the src directory: python -m benchmarks.bench_figures [--days 2500] [--forecast-days 90] [--points 1000] [--engine json]
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+import plotly.io.json
+from benchmarks.synthetic import random_walk_prices
+from helpers import forecast_helpers
+
+def xgboost_result(data, forecast_days, seed):
+    # Shaped like the XGBoost branch of perform_forecast, predictions are the prices plus noise
+    rng = np.random.default_rng(seed)
+    train_size = int(len(data) * 0.7)
+    train_df, test_df = data.iloc[:train_size], data.iloc[train_size:]
+    test_predicted = test_df['Close'].to_numpy() * (1 + rng.normal(0, 0.01, len(test_df)))
+    index = pd.bdate_range(data.index[-1] + pd.offsets.BDay(), periods=forecast_days)
+    forecast_data = pd.Series(data['Close'].iloc[-1] * np.exp(np.cumsum(rng.normal(0, 0.01, forecast_days))), index=index, name='Adj Close')
+    min_price = max(0, data['Close'].min() * 0.9)
+    return min_price, data['Close'].max() * 1.1, train_df, test_df, test_predicted, forecast_data
+
+def prophet_result(data, forecast_days, seed):
+    rng = np.random.default_rng(seed)
+    data_prophet = pd.DataFrame({'ds': data.index, 'y': data['Close'].to_numpy()})
+    ds = pd.concat([data_prophet['ds'], pd.Series(pd.date_range(data.index[-1] + pd.Timedelta(days=1), periods=forecast_days))], ignore_index=True)
+    yhat = np.concatenate([data['Close'].to_numpy(), np.full(forecast_days, data['Close'].iloc[-1])]) * (1 + rng.normal(0, 0.01, len(ds)))
+    forecast_data = pd.DataFrame({'ds': ds, 'yhat': yhat, 'yhat_lower': yhat * 0.95, 'yhat_upper': yhat * 1.05})
+    min_price = max(0, data['Close'].min() * 0.9)
+    return min_price, data['Close'].max() * 1.1, data_prophet, forecast_data
+
+def measure(data, model_type, forecast_days, forecast_result, engine, repeat):
+    start = timeit.default_timer()
+    figure = forecast_helpers.create_forecast_figure(data, 'BENCH', model_type, forecast_days, forecast_result)
+    build_seconds = timeit.default_timer() - start
+    # Dash serializes callback outputs with plotly's to_json
+    encode = lambda: plotly.io.json.to_json_plotly(figure, engine=engine)
+    encode_seconds = min(timeit.repeat(encode, number=1, repeat=repeat))
+    points = sum(len(trace.x) for trace in figure['data'])
+    trace_types = sorted({trace.type for trace in figure['data']})
+    return points, len(encode()), build_seconds, encode_seconds, trace_types
+
+def run(days, forecast_days, points, engine, seed, repeat):
+    data = random_walk_prices(days, seed)
+    results = {
+        'XGBoost': xgboost_result(data, forecast_days, seed),
+        'Prophet': prophet_result(data, forecast_days, seed)
+    }
+    print(f"JSON engine: {engine}")
+    print(f"{'Model':<9}{'Figure':<13}{'Points':>8}{'JSON KB':>10}{'Build ms':>10}{'Encode ms':>11}  Traces")
+    for model_type, forecast_result in results.items():
+        for label, chart_points in (('full', 0), (f'lttb {points}', points)):
+            forecast_helpers.FORECAST_CHART_POINTS = chart_points
+            n_points, size, build_seconds, encode_seconds, trace_types = measure(data, model_type, forecast_days, forecast_result, engine, repeat)
+            print(f"{model_type:<9}{label:<13}{n_points:>8}{size / 1024:>10.1f}{build_seconds * 1e3:>10.1f}{encode_seconds * 1e3:>11.1f}  {', '.join(trace_types)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark forecast figure size and serialization time')
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--forecast-days', type=int, default=90)
+    parser.add_argument('--points', type=int, default=forecast_helpers.FORECAST_CHART_POINTS)
+    parser.add_argument('--engine', default=plotly.io.json.config.default_engine, choices=['json', 'orjson'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.days, args.forecast_days, args.points, args.engine, args.seed, args.repeat)
@@ -0,0 +1,44 @@
+# Compares Prophet profiles on fit time and holdout interval quality for the dropdown tickers.
+# Run from the src directory: python -m benchmarks.bench_prophet [--tickers AAPL MSFT] [--holdout 60]
+import argparse
+import logging
+import time
+import numpy as np
+from layouts.forecast import TICKERS
+from models.utils import download_data
+from models.prophet_model import PROPHET_PROFILES, fit_prophet, forecast_prophet
+
+def evaluate(data, profile, holdout):
+    start = time.perf_counter()
+    model, data_prophet = fit_prophet(data.iloc[:-holdout], profile=profile)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forecast = forecast_prophet(model, data_prophet, holdout).tail(holdout)
+    predict_seconds = time.perf_counter() - start
+
+    # make_future_dataframe counts calendar days, compare on the business days both sides have
+    actual = data['Close'].iloc[-holdout:]
+    forecast = forecast.set_index('ds').reindex(actual.index).dropna()
+    actual = actual.loc[forecast.index].to_numpy()
+    coverage = np.mean((actual >= forecast['yhat_lower']) & (actual <= forecast['yhat_upper']))
+    width = np.mean((forecast['yhat_upper'] - forecast['yhat_lower']) / actual)
+    mape = np.mean(np.abs(forecast['yhat'] - actual) / actual)
+    return fit_seconds, predict_seconds, coverage, width, mape
+
+def run(tickers, profiles, holdout):
+    print(f"{'Ticker':<8}{'Profile':<10}{'Fit s':>8}{'Predict s':>11}{'Coverage':>10}{'Width':>8}{'MAPE':>8}")
+    for ticker in tickers:
+        data = download_data(ticker)
+        for profile in profiles:
+            fit_seconds, predict_seconds, coverage, width, mape = evaluate(data, profile, holdout)
+            print(f"{ticker:<8}{profile:<10}{fit_seconds:>8.2f}{predict_seconds:>11.2f}{coverage:>10.1%}{width:>8.1%}{mape:>8.1%}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare Prophet profiles')
+    parser.add_argument('--tickers', nargs='+', default=TICKERS)
+    parser.add_argument('--profiles', nargs='+', default=list(PROPHET_PROFILES), choices=list(PROPHET_PROFILES))
+    parser.add_argument('--holdout', type=int, default=60)
+    args = parser.parse_args()
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    run(args.tickers, args.profiles, args.holdout)
@@ -0,0 +1,31 @@
+# Compares the hyperparameter search modes of prepare_and_train_model on the same tickers.
+# Run from the src directory: python -m benchmarks.bench_search [--tickers AAPL MSFT] [--modes grid halving]
+import argparse
+import time
+from sklearn.metrics import mean_squared_error
+from layouts.forecast import TICKERS
+from models.utils import download_data
+from models.xgboost_model import prepare_and_train_model, SEARCH_MODES
+
+def run(tickers, modes, max_fits, time_budget):
+    print(f"{'Ticker':<8}{'Search':<10}{'Seconds':>10}{'Test MSE':>14}{'Speedup':>10}")
+    for ticker in tickers:
+        data = download_data(ticker)
+        baseline = None
+        for mode in modes:
+            start = time.perf_counter()
+            _, _, _, _, _, y_test, y_pred_test = prepare_and_train_model(data.copy(), search=mode, max_fits=max_fits, time_budget=time_budget)
+            seconds = time.perf_counter() - start
+            if baseline is None:
+                baseline = seconds
+            mse = mean_squared_error(y_test, y_pred_test)
+            print(f"{ticker:<8}{mode:<10}{seconds:>10.2f}{mse:>14.4f}{baseline / seconds:>9.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare hyperparameter search modes')
+    parser.add_argument('--tickers', nargs='+', default=TICKERS[:3])
+    parser.add_argument('--modes', nargs='+', default=SEARCH_MODES, choices=SEARCH_MODES)
+    parser.add_argument('--max-fits', type=int, default=120)
+    parser.add_argument('--time-budget', type=float, default=None)
+    args = parser.parse_args()
+    run(args.tickers, args.modes, args.max_fits, args.time_budget)
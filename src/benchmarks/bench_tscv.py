@@ -0,0 +1,27 @@
+# Compares K-fold searches with the forward-chaining, early-stopped 'timeseries' search on synthetic random walks.
+# Run from the src directory: python -m benchmarks.bench_tscv [--seeds 0 1 2] [--modes halving timeseries]
+import argparse
+import time
+from sklearn.metrics import mean_squared_error
+from benchmarks.synthetic import random_walk_prices
+from models.xgboost_model import prepare_and_train_model, SEARCH_MODES
+
+def run(seeds, modes, n_days, max_fits):
+    print(f"{'Seed':<6}{'Search':<12}{'Seconds':>10}{'Trees':>8}{'Test MSE':>14}")
+    for seed in seeds:
+        data = random_walk_prices(n_days, seed)
+        for mode in modes:
+            start = time.perf_counter()
+            _, _, _, best_model, _, y_test, y_pred_test = prepare_and_train_model(data.copy(), search=mode, max_fits=max_fits)
+            seconds = time.perf_counter() - start
+            mse = mean_squared_error(y_test, y_pred_test)
+            print(f"{seed:<6}{mode:<12}{seconds:>10.2f}{best_model.get_booster().num_boosted_rounds():>8}{mse:>14.4f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark time-series cross-validation with early stopping')
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0, 1, 2])
+    parser.add_argument('--modes', nargs='+', default=['halving', 'random', 'timeseries'], choices=SEARCH_MODES)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--max-fits', type=int, default=120)
+    args = parser.parse_args()
+    run(args.seeds, args.modes, args.days, args.max_fits)
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+def random_walk_prices(n_days=2500, seed=0, drift=0.0004, volatility=0.02, start_price=100.0):
+    # Geometric random walk shaped like the output of models.utils.download_data
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, n_days)))
+    spread = np.abs(rng.normal(0, volatility / 2, n_days))
+    index = pd.bdate_range('2015-01-01', periods=n_days, name='Date')
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, volatility / 4, n_days)),
+        'High': close * (1 + spread),
+        'Low': close * (1 - spread),
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(1_000_000, 50_000_000, n_days)
+    }, index=index)
@@ -1,9 +1,12 @@
 from dash import Input, Output, State, html, dcc
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
-from helpers.forecast_helpers import fetch_stock_data, create_metrics_card, calculate_metrics, create_growth_bar, create_profitability_bar, create_volatility_graph 
-from helpers.forecast_helpers import calculate_moving_averages, create_price_figure, perform_forecast, calculate_recommendations
+from helpers.forecast_helpers import fetch_stock_data, fetch_price_history, fetch_stock_info, create_metrics_card, calculate_metrics, create_growth_bar, create_profitability_bar, create_volatility_graph 
+from helpers.forecast_helpers import calculate_moving_averages, create_price_figure, price_view, relayout_x_range, view_covers, load_or_compute_forecast, calculate_recommendations, FORECAST_STAGES
+from helpers.forecast_helpers import price_figure_patch, forecast_figure_update
 from models.utils import download_data
+from models.executor import TrainingError
 
 def register_callbacks(app):
     @app.callback(
@@ -20,7 +23,7 @@ def register_callbacks(app):
         [Input('index-dropdown', 'value')]
     )
     def update_growth_bar(ticker):
-        stock_data, stock_info = fetch_stock_data(ticker)
+        stock_info = fetch_stock_info(ticker)
         growth_metrics = {
             'Revenue Growth (YoY)': stock_info.get('revenueGrowth'),
             'Earnings Growth (YoY)': stock_info.get('earningsGrowth'),
@@ -35,7 +38,7 @@ def register_callbacks(app):
         [Input('index-dropdown', 'value')]
     )
     def update_profitability_bar(ticker):
-        stock_data, stock_info = fetch_stock_data(ticker)
+        stock_info = fetch_stock_info(ticker)
         profitability_metrics = {
             'Profit Margins': stock_info.get('profitMargins'),
             'Gross Margins': stock_info.get('grossMargins'),
@@ -51,17 +54,51 @@ def register_callbacks(app):
         [Input('index-dropdown', 'value')]
     )
     def update_volatility_graph(ticker):
-        stock_data, _ = fetch_stock_data(ticker)
+        stock_data = fetch_price_history(ticker)
         return create_volatility_graph(stock_data)
 
     @app.callback(
-        Output('price-graph', 'figure'),
-        [Input('index-dropdown', 'value')]
+        [
+            Output('price-graph', 'figure'),
+            Output('price-graph-view', 'data')
+        ],
+        [Input('index-dropdown', 'value')],
+        [State('price-graph-view', 'data')]
     )
-    def update_price_graph(ticker):
+    def update_price_graph(ticker, current_view):
+        # The whole figure goes out once, later tickers only replace its traces and ticker-specific layout values
         data = download_data(ticker)
         ma50, ma200 = calculate_moving_averages(data)
-        return create_price_figure(data, ma50, ma200, ticker)
+        view = price_view(data)
+        figure = create_price_figure(data, ma50, ma200, ticker, view)
+        if current_view:
+            figure = price_figure_patch(figure)
+        return figure, dict(view, ticker=ticker)
+
+    @app.callback(
+        [
+            Output('price-graph', 'figure', allow_duplicate=True),
+            Output('price-graph-view', 'data', allow_duplicate=True)
+        ],
+        [Input('price-graph', 'relayoutData')],
+        [
+            State('index-dropdown', 'value'),
+            State('price-graph-view', 'data')
+        ],
+        prevent_initial_call=True
+    )
+    def update_price_resolution(relayout_data, ticker, current_view):
+        # Zooming redraws the candles at the resolution of the visible range, panning within the loaded window does not
+        x_range = relayout_x_range(relayout_data)
+        if x_range is False:
+            raise PreventUpdate
+        data = download_data(ticker)
+        view = price_view(data, x_range)
+        if current_view and current_view.get('ticker') == ticker and view_covers(current_view, view):
+            raise PreventUpdate
+        ma50, ma200 = calculate_moving_averages(data)
+        figure = create_price_figure(data, ma50, ma200, ticker, view)
+        return price_figure_patch(figure, traces_only=True), dict(view, ticker=ticker)
 
     @app.callback(
         [
@@ -72,6 +109,7 @@ def register_callbacks(app):
             Output('gauge-container', 'children'),
             Output('gauge-container', 'style'),
             Output('loading-forecast', 'style'), 
+            Output('forecast-graph-state', 'data')
         ],
         [
             Input('generate-forecast-btn', 'n_clicks')
@@ -80,10 +118,23 @@ def register_callbacks(app):
             State('index-dropdown', 'value'),
             State('model-selection', 'value'),
             State('forecast-period-dropdown', 'value'),
-            State('earnings-percentage-input', 'value')
-        ]
+            State('earnings-percentage-input', 'value'),
+            State('forecast-graph-state', 'data')
+        ],
+        # Runs as a background job so no request thread waits for training, leaving the page or Cancel stops it
+        background=True,
+        running=[
+            (Output('generate-forecast-btn', 'disabled'), True, False),
+            (Output('cancel-forecast-btn', 'style'), {'display': 'block', 'margin-left': '10px'}, {'display': 'none'}),
+            (Output('forecast-progress', 'style'), {'display': 'flex', 'height': '20px', 'margin-bottom': '20px', 'font-family': 'Hanken Grotesk'}, {'display': 'none'})
+        ],
+        cancel=[Input('cancel-forecast-btn', 'n_clicks'), Input('url', 'pathname')],
+        progress=[Output('forecast-progress', 'value'), Output('forecast-progress', 'label')]
     )
-    def update_forecast_graph(n_clicks, ticker, model_type, forecast_days, earnings_percentage):
+    def update_forecast_graph(set_progress, n_clicks, ticker, model_type, forecast_days, earnings_percentage, shown_key):
+        def report_stage(stage):
+            set_progress(FORECAST_STAGES[stage])
+
         first_click_style = {
             'position': 'relative',
             'z-index': '1'
@@ -101,251 +152,23 @@ def register_callbacks(app):
         }
 
         if not n_clicks:
-            return {}, {'display': 'none'}, None, {'display': 'none'}, None, {'display': 'none'},first_click_style
+            return {}, {'display': 'none'}, None, {'display': 'none'}, None, {'display': 'none'},first_click_style, None
         
+        report_stage('download')
         data = download_data(ticker)
-        _, stock_info = fetch_stock_data(ticker)
-        shapes = []
+        stock_info = fetch_stock_info(ticker)
 
-        if model_type == 'XGBoost':
-            min_price, max_price, train_df, test_df, test_predicted, forecast_data = perform_forecast(data, ticker, model_type, forecast_days)
-            shapes.extend([
-                dict(
-                    type="line",
-                    x0=test_df.index[0],
-                    y0=min_price,
-                    x1=test_df.index[0],
-                    y1=max_price,
-                    line=dict(
-                        color="Purple",
-                        width=2,
-                        dash="dash",
-                        name='Train-Test Split'
-                    ),
-                ),
-                dict(
-                    type="line",
-                    x0=forecast_data.index[0],
-                    y0=min_price,
-                    x1=forecast_data.index[0],
-                    y1=max_price,
-                    line=dict(
-                        color="Black",
-                        width=2,
-                        dash="dash",
-                        name='Forecast Start'
-                    ),
-                )
-            ])
-
-            forecast_fig = {
-                'data': [
-                    go.Scatter(
-                        x=data.index,
-                        y=data['Close'],
-                        mode='lines',
-                        name='Actual Prices',
-                        line=dict(color='blue')
-                    ),
-                    go.Scatter(
-                        x=test_df.index,
-                        y=test_predicted,
-                        mode='lines',
-                        name='Predicted Prices',
-                        line=dict(color='red')
-                    ),
-                    go.Scatter(
-                        x=forecast_data.index,
-                        y=forecast_data,
-                        mode='lines',
-                        name=f'{forecast_days}-Day Forecast',
-                        line=dict(color='green')
-                    ),
-                    go.Scatter(
-                        x=[test_df.index[0]],
-                        y=[data['Close'].iloc[len(train_df)]],
-                        mode='lines+markers',
-                        name='Train-Test Split',
-                        line=dict(color='purple', dash='dash')
-                    ),
-                    go.Scatter(
-                        x=[forecast_data.index[0]],
-                        y=[forecast_data.iloc[0]],
-                        mode='lines+markers',
-                        name='Forecast Start',
-                        line=dict(color='black', dash='dash')
-                    ),
-                ],
-                'layout': {
-                    'title': {
-                        'text': f'Predicted Stock Price of {ticker} using XGBoost',
-                        'font': {'family': 'Prata', 'color': '#050A30'}
-                    },
-                    'yaxis': {
-                        'title': 'Close Price',
-                        'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
-                        'tickfont': {'family': 'Hanken Grotesk'},
-                        'range': [min_price, max_price],
-                        'zeroline': False
-                    },
-                    'xaxis': {
-                        'title': 'Date',
-                        'type': 'date',
-                        'tickformat': '%b %Y',
-                        'tickmode': 'auto',
-                        'nticks': 20,
-                        'tickformatstops': [
-                            {'dtickrange': [None, 86400000], 'value': '%d %b %Y'},
-                            {'dtickrange': [86400000, 604800000], 'value': '%d %b %Y'},
-                            {'dtickrange': [604800000, "M1"], 'value': '%d %b %Y'},
-                            {'dtickrange': ["M1", "M6"], 'value': '%b %Y'},
-                            {'dtickrange': ["M6", None], 'value': '%b %Y'}
-                        ],
-                        'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
-                        'tickfont': {'family': 'Hanken Grotesk'},
-                        'showline': True,
-                        'linewidth': 1,
-                        'linecolor': 'black'
-                    },
-                    'plot_bgcolor': 'white',
-                    'paper_bgcolor': 'white',
-                    'font': {'family': 'Hanken Grotesk'},
-                    'showlegend': True,
-                    'height': 500,
-                    'margin': dict(l=50, r=50, t=50, b=50),
-                    'shapes': shapes
-                }
-            }
-        elif model_type == 'Prophet':
-            min_price, max_price, data_prophet, forecast_data = perform_forecast(data, ticker, model_type, forecast_days)
-        
-            shapes.extend([
-                dict(
-                    type="line",
-                    x0=data_prophet['ds'].iloc[-1],
-                    y0=min_price,
-                    x1=data_prophet['ds'].iloc[-1],
-                    y1=max_price,
-                    line=dict(
-                        color="Black",
-                        width=2,
-                        dash="dash",
-                        name='Forecast Start'
-                    ),
-                )
-            ])
-
-            forecast_fig = {
-                'data': [
-                    go.Scatter(
-                        x=data_prophet['ds'],
-                        y=data_prophet['y'],
-                        mode='lines',
-                        name='Actual Prices',
-                        line=dict(color='blue')
-                    ),
-                    go.Scatter(
-                        x=forecast_data['ds'][:-forecast_days],
-                        y=forecast_data['yhat'][:-forecast_days],
-                        mode='lines',
-                        name='Predicted Prices',
-                        line=dict(color='red')
-                    ),
-                    go.Scatter(
-                        x=forecast_data['ds'][:-forecast_days],
-                        y=forecast_data['yhat_upper'][:-forecast_days],
-                        fill=None,
-                        mode='lines',
-                        line=dict(color='orangered', width=0.4),
-                        fillcolor='rgba(255, 69, 0, 0.2)',
-                        name='Upper Confidence Interval',
-                        showlegend=False
-                    ),
-                    go.Scatter(
-                        x=forecast_data['ds'][:-forecast_days],
-                        y=forecast_data['yhat_lower'][:-forecast_days],
-                        fill='tonexty',
-                        mode='lines',
-                        line=dict(color='orangered', width=0.4),
-                        fillcolor='rgba(255, 69, 0, 0.2)',
-                        name='Lower Confidence Interval',
-                        showlegend=False
-                    ),
-                    go.Scatter(
-                        x=forecast_data['ds'][-forecast_days:],
-                        y=forecast_data['yhat'][-forecast_days:],
-                        mode='lines',
-                        name=f'{forecast_days}-Day Forecast',
-                        line=dict(color='green')
-                    ),
-                    go.Scatter(
-                        x=forecast_data['ds'][-forecast_days:],
-                        y=forecast_data['yhat_upper'][-forecast_days:],
-                        fill=None,
-                        mode='lines',
-                        line=dict(color='green', width=0.4),
-                        fillcolor='rgba(28, 184, 24, 0.25)',
-                        name='Upper Confidence Interval',
-                        showlegend=False
-                    ),
-                    go.Scatter(
-                        x=forecast_data['ds'][-forecast_days:],
-                        y=forecast_data['yhat_lower'][-forecast_days:],
-                        fill='tonexty',
-                        mode='lines',
-                        line=dict(color='green', width=0.4),
-                        fillcolor='rgba(28, 184, 24, 0.25)',
-                        name='Lower Confidence Interval',
-                        showlegend=False
-                    ),
-                    go.Scatter(
-                        x=[data_prophet['ds'].iloc[-1]],
-                        y=[data['Close'].iloc[-1]],
-                        mode='lines+markers',
-                        name='Forecast Start',
-                        line=dict(color='black', dash='dash')
-                    ),
-                ],
-                'layout': {
-                    'title': {
-                        'text': f'Predicted Stock Price of {ticker} using Prophet',
-                        'font': {'family': 'Prata', 'color': '#050A30'}
-                    },
-                    'yaxis': {
-                        'title': 'Close Price',
-                        'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
-                        'tickfont': {'family': 'Hanken Grotesk'},
-                        'range': [max(0, min_price), max_price],
-                        'zeroline': False
-                    },
-                    'xaxis': {
-                        'title': 'Date',
-                        'type': 'date',
-                        'tickformat': '%b %Y',
-                        'tickmode': 'auto',
-                        'nticks': 20,
-                        'tickformatstops': [
-                            {'dtickrange': [None, 86400000], 'value': '%d %b %Y'},
-                            {'dtickrange': [86400000, 604800000], 'value': '%d %b %Y'},
-                            {'dtickrange': [604800000, "M1"], 'value': '%d %b %Y'},
-                            {'dtickrange': ["M1", "M6"], 'value': '%b %Y'},
-                            {'dtickrange': ["M6", None], 'value': '%b %Y'}
-                        ],
-                        'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
-                        'tickfont': {'family': 'Hanken Grotesk'},
-                        'showline': True,
-                        'linewidth': 1,
-                        'linecolor': 'black'
-                    },
-                    'plot_bgcolor': 'white',
-                    'paper_bgcolor': 'white',
-                    'font': {'family': 'Hanken Grotesk'},
-                    'showlegend': True,
-                    'height': 500,
-                    'margin': dict(l=50, r=50, t=50, b=50),
-                    'shapes': shapes
-                }
-            }
+        # Forecasts precomputed by batch_forecast.py or an earlier click, typically for a new earnings target, are served
+        # from the result store and only the recommendations are recomputed
+        try:
+            result = load_or_compute_forecast(data, ticker, model_type, forecast_days, on_progress=report_stage)
+        except TrainingError as e:
+            print(f"Error forecasting {ticker} with {model_type}: {e}")
+            return {}, {'display': 'none'}, None, {'display': 'none'}, None, {'display': 'none'}, first_click_style, None
+        # A graph already showing a forecast only receives the traces that changed, such as the forecast for a new horizon
+        key = result['key']
+        forecast_fig = forecast_figure_update(result['figure'], key, shown_key)
+        forecast_data = result['forecast_data']
 
         forecast_graph_style = {
             'margin-top': '30px',
@@ -450,4 +273,4 @@ def register_callbacks(app):
         }
         loading_style = first_click_style if n_clicks and n_clicks < 1 else subsequent_click_style
 
-        return forecast_fig, forecast_graph_style, recommendations, recommendations_style, dcc.Graph(figure=gauge_graph), gauge_graph_style, loading_style
+        return forecast_fig, forecast_graph_style, recommendations, recommendations_style, dcc.Graph(figure=gauge_graph), gauge_graph_style, loading_style, key
@@ -0,0 +1,86 @@
+import threading
+import time
+
+class TTLCache:
+    # Process-level cache where concurrent callers for the same key share a single load.
+    # Entries older than ttl but younger than stale_ttl are served while a background refresh runs.
+    def __init__(self, ttl, stale_ttl=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[1] if entry is not None else None
+            if entry is not None and age < self.ttl:
+                self.hits += 1
+                return entry[0]
+
+            call = self._inflight.get(key)
+            if entry is not None and self.stale_ttl and age < self.stale_ttl:
+                self.stale_hits += 1
+                if call is None:
+                    call = self._inflight[key] = self._new_call()
+                    threading.Thread(target=self._refresh, args=(key, loader, call), daemon=True).start()
+                return entry[0]
+
+            if call is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                call = self._inflight[key] = self._new_call()
+                owner = True
+
+        if owner:
+            self._load(key, loader, call)
+        else:
+            call['done'].wait()
+        if call['error'] is not None:
+            raise call['error']
+        return call['value']
+
+    def _new_call(self):
+        return {'done': threading.Event(), 'value': None, 'error': None}
+
+    def _load(self, key, loader, call):
+        try:
+            call['value'] = loader()
+            with self._lock:
+                self._entries[key] = (call['value'], time.monotonic())
+        except Exception as e:
+            call['error'] = e
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call['done'].set()
+
+    def _refresh(self, key, loader, call):
+        self._load(key, loader, call)
+        if call['error'] is not None:
+            print(f"Error refreshing cached {key}: {call['error']}")
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'size': len(self._entries),
+                'inflight': len(self._inflight)
+            }
@@ -0,0 +1,39 @@
+import numpy as np
+
+def _as_numbers(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+def lttb_indices(x, y, n_out):
+    # Largest-triangle-three-buckets: keeps the first and last point and, from every bucket in between, the point
+    # forming the largest triangle with the previous pick and the mean of the next bucket
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_numbers(x)
+    y = _as_numbers(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picks = np.empty(n_out, dtype=np.int64)
+    picks[0] = 0
+    picks[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        picks[bucket + 1] = previous
+    return picks
+
+def downsample_indices(x, y, n_out, keep_last=0):
+    # Positions to draw for about n_out points, the last keep_last points are all kept. n_out 0 keeps everything.
+    n = len(y)
+    if n_out <= 0 or n <= n_out:
+        return np.arange(n)
+    head = n - min(keep_last, n)
+    picks = lttb_indices(x[:head], y[:head], max(3, n_out - (n - head)))
+    return np.concatenate([picks, np.arange(head, n)])
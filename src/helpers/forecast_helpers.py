@@ -1,25 +1,52 @@
+import os
+import time
 import pandas as pd
 import yfinance as yf
 import numpy as np
-from dash import html
+from dash import html, Patch, no_update
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 from pandas.tseries.holiday import USFederalHolidayCalendar
-from models.xgboost_model import prepare_and_train_model, forecast_with_rolling, forecast_without_rolling
-from models.prophet_model import fit_prophet, forecast_prophet
+from models.xgboost_model import prepare_features, predict_test_set, prepare_and_train_model, forecast_with_rolling, forecast_without_rolling, train_direct_model, forecast_direct, REFIT_STRATEGIES
+from models.prophet_model import prepare_prophet_data, fit_prophet, forecast_prophet, predict_history, model_to_json, model_from_json, warm_start_params
+from models.registry import data_fingerprint, model_fingerprint, load_model, save_model, load_params, save_params
+from models import features
+from models.executor import TrainingExecutor, report_progress
+from models.compute import ComputeBudget
+from models.utils import DATA_DIR, load_ohlc
+from helpers.cache import TTLCache
+from helpers.result_store import result_key, load_result, load_fresh_result, save_result, RESULT_FRESH_SECONDS
+from helpers.downsample import downsample_indices
+from helpers.serialization import plot_dates, plot_values
+from plotly.io.json import to_json_plotly
+
+# Shared by every forecast-page callback so one ticker selection downloads the data once.
+# The one-year history moves every trading minute, the fundamentals in Ticker.info about once a day.
+price_history_cache = TTLCache(ttl=int(os.environ.get('PRICE_HISTORY_TTL', 60)))
+stock_info_cache = TTLCache(
+    ttl=int(os.environ.get('STOCK_INFO_TTL', 6 * 3600)),
+    stale_ttl=int(os.environ.get('STOCK_INFO_STALE_TTL', 24 * 3600))
+)
+
+def fetch_price_history(ticker):
+    hist = price_history_cache.get(ticker, lambda: yf.Ticker(ticker).history(period="1y"))
+    # Callers add columns to the history, hand out copies so the cached entry stays clean
+    return hist.copy()
+
+def fetch_stock_info(ticker):
+    return dict(stock_info_cache.get(ticker, lambda: yf.Ticker(ticker).info))
 
 def fetch_stock_data(ticker):
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="1y")
-    info = stock.info
-    return hist, info
+    return fetch_price_history(ticker), fetch_stock_info(ticker)
 
-def calculate_metrics(stock_data, stock_info):
-    stock_data['MA20'] = stock_data['Close'].rolling(window=20).mean()
-    stock_data['MA50'] = stock_data['Close'].rolling(window=50).mean()
+def add_volatility(stock_data):
+    stock_data['Returns'] = features.returns(stock_data['Close'])
+    stock_data['Volatility'] = features.rolling_std(stock_data['Returns'], 20) * np.sqrt(252)
 
-    stock_data['Returns'] = stock_data['Close'].pct_change()
-    stock_data['Volatility'] = stock_data['Returns'].rolling(window=20).std() * np.sqrt(252)
+def calculate_metrics(stock_data, stock_info):
+    stock_data['MA20'] = features.sma(stock_data['Close'], 20)
+    stock_data['MA50'] = features.sma(stock_data['Close'], 50)
+    add_volatility(stock_data)
 
     current_price = stock_info.get('currentPrice', None)
     shares_outstanding = stock_info.get('sharesOutstanding', None)
@@ -28,8 +55,9 @@ def calculate_metrics(stock_data, stock_info):
     else:
         current_market_cap = None
 
+    avg_volume_series = pd.Series(features.sma(stock_data['Volume'], 20), index=stock_data.index)
     current_volume = stock_data['Volume'].iloc[-1] if len(stock_data) >=1 else None
-    current_avg_volume = stock_data['Volume'].rolling(window=20).mean().iloc[-1] if len(stock_data) >= 20 else None
+    current_avg_volume = avg_volume_series.iloc[-1] if len(stock_data) >= 20 else None
 
     target_high_price = stock_info.get('targetHighPrice', None)
     target_low_price = stock_info.get('targetLowPrice', None)
@@ -72,7 +100,6 @@ def calculate_metrics(stock_data, stock_info):
     volume_trend_month = calculate_trend(current_volume, past_volume_month)
 
     # Average Volume trends
-    avg_volume_series = stock_data['Volume'].rolling(window=20).mean()
     past_avg_volume_week = get_past_value(avg_volume_series, 5)
     past_avg_volume_month = get_past_value(avg_volume_series, 21)
 
@@ -302,13 +329,12 @@ def create_profitability_bar(profitability_metrics):
 
 
 def create_volatility_graph(stock_data):
-    stock_data['Returns'] = stock_data['Close'].pct_change()
-    stock_data['Volatility'] = stock_data['Returns'].rolling(window=20).std() * np.sqrt(252)
+    add_volatility(stock_data)
 
     return go.Figure(data=[
         go.Scatter(
-            x=stock_data.index,
-            y=stock_data['Volatility'],
+            x=plot_dates(stock_data.index),
+            y=plot_values(stock_data['Volatility']),
             line=dict(color='green', width=1.5),
             fill='tozeroy',
             name='Volatility'
@@ -346,11 +372,72 @@ def create_volatility_graph(stock_data):
     )
 
 def calculate_moving_averages(data):
-    ma50 = data['Close'].rolling(window=50).mean()
-    ma200 = data['Close'].rolling(window=200).mean()
+    ma50 = pd.Series(features.sma(data['Close'], 50), index=data.index)
+    ma200 = pd.Series(features.sma(data['Close'], 200), index=data.index)
     return ma50, ma200
 
-def create_price_figure(data, ma50, ma200, ticker):
+# Line traces longer than this are drawn with WebGL
+SCATTERGL_THRESHOLD = int(os.environ.get('SCATTERGL_THRESHOLD', 2000))
+
+def line_trace(x, y, **kwargs):
+    # Dates on x, prices on y, as compact arrays
+    trace = go.Scattergl if len(x) > SCATTERGL_THRESHOLD else go.Scatter
+    return trace(x=plot_dates(x), y=plot_values(y), **kwargs)
+
+# Business days per candle of each chart resolution, the finest one that keeps the visible range under
+# PRICE_CHART_MAX_BARS candles is drawn
+PRICE_RESOLUTIONS = {'D': 1, 'W': 5, 'M': 21}
+PRICE_RESOLUTION_NAMES = {'D': 'Candlesticks', 'W': 'Weekly candles', 'M': 'Monthly candles'}
+PRICE_CHART_MAX_BARS = int(os.environ.get('PRICE_CHART_MAX_BARS', 300))
+
+def relayout_x_range(relayout_data):
+    # Visible dates of a price-graph relayoutData, None once the user resets the zoom, False when the x axis did not change
+    if not relayout_data:
+        return False
+    if relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return False
+
+def price_view(data, x_range=None):
+    # Resolution and date window of the candles sent for a visible range, the window is padded by the visible span
+    # on both sides so panning does not fetch new candles right away. The whole history has no window.
+    if x_range is None:
+        start, end = data.index[0], data.index[-1]
+    else:
+        start, end = sorted(pd.Timestamp(value) for value in x_range)
+    days = max(1, np.busday_count(start.date(), end.date()))
+    resolution = next((resolution for resolution, bar_days in PRICE_RESOLUTIONS.items() if days / bar_days <= PRICE_CHART_MAX_BARS), 'M')
+    if x_range is None:
+        return {'resolution': resolution, 'start': None, 'end': None}
+    span = end - start
+    return {'resolution': resolution, 'start': (start - span).isoformat(), 'end': (end + span).isoformat()}
+
+def view_covers(view, other):
+    # Whether the candles loaded for view already serve other
+    if not view or view['resolution'] != other['resolution']:
+        return False
+    if view['start'] is None:
+        return True
+    return other['start'] is not None and view['start'] <= other['start'] and other['end'] <= view['end']
+
+def price_bars(data, ticker, view):
+    bars = data
+    if view['resolution'] != 'D':
+        bars = load_ohlc(ticker, view['resolution'])
+        if bars is None:
+            bars = data
+    if view['start'] is not None:
+        bars = bars[(bars.index >= pd.Timestamp(view['start'])) & (bars.index <= pd.Timestamp(view['end']))]
+    return bars
+
+def create_price_figure(data, ma50, ma200, ticker, view=None):
+    # data and the moving averages are daily, the candles follow the resolution and window of view
+    view = view or {'resolution': 'D', 'start': None, 'end': None}
+    bars = price_bars(data, ticker, view)
     last_price = data['Close'].iloc[-1]
     min_price = max(0, data['Close'].min() * 0.9)
     max_price = data['Close'].max() * 1.1
@@ -358,24 +445,24 @@ def create_price_figure(data, ma50, ma200, ticker):
     return {
         'data': [
             go.Candlestick(
-                x=data.index,
-                open=data['Open'],
-                high=data['High'],
-                low=data['Low'],
-                close=data['Close'],
-                name='Candlesticks'
+                x=plot_dates(bars.index),
+                open=plot_values(bars['Open']),
+                high=plot_values(bars['High']),
+                low=plot_values(bars['Low']),
+                close=plot_values(bars['Close']),
+                name=PRICE_RESOLUTION_NAMES[view['resolution']]
             ),
-            go.Scatter(
-                x=data.index,
-                y=ma50,
+            line_trace(
+                bars.index,
+                ma50.reindex(bars.index),
                 mode='lines',
                 name='MA 50',
                 line=dict(color='blue')
             ),
-            go.Scatter(
-                x=data.index, 
-                y=ma200, 
-                mode='lines', 
+            line_trace(
+                bars.index,
+                ma200.reindex(bars.index),
+                mode='lines',
                 name='MA 200',
                 line=dict(color='red')
             ),
@@ -394,6 +481,8 @@ def create_price_figure(data, ma50, ma200, ticker):
                 'text': f'Historic Price for {ticker}',
                 'font': {'family': 'Prata', 'color': '#050A30'}
             },
+            # Keeps the user's zoom while the candles are swapped for another resolution
+            'uirevision': ticker,
             'yaxis': {
                 'title': 'Close Price',
                 'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
@@ -433,26 +522,521 @@ def create_price_figure(data, ma50, ma200, ticker):
         }
     }
 
-def perform_forecast(data, ticker, model_type, forecast_days):
+def price_figure_patch(figure, traces_only=False):
+    # Turns the price figure on screen into figure: its traces, and the layout values that depend on the ticker unless
+    # only the candles changed
+    patch = Patch()
+    patch['data'] = figure['data']
+    if not traces_only:
+        patch['layout']['title']['text'] = figure['layout']['title']['text']
+        patch['layout']['yaxis']['range'] = figure['layout']['yaxis']['range']
+        patch['layout']['uirevision'] = figure['layout']['uirevision']
+    return patch
+
+# Points per history trace of the forecast figures, the last FORECAST_CHART_RECENT of them are all drawn and the
+# rest is reduced with LTTB. 0 draws every point.
+FORECAST_CHART_POINTS = int(os.environ.get('FORECAST_CHART_POINTS', 1000))
+FORECAST_CHART_RECENT = int(os.environ.get('FORECAST_CHART_RECENT', 120))
+
+def history_points(x, y):
+    return downsample_indices(x, y, FORECAST_CHART_POINTS, FORECAST_CHART_RECENT)
+
+def create_xgboost_forecast_figure(data, ticker, forecast_days, min_price, max_price, train_df, test_df, test_predicted, forecast_data):
+    shapes = [
+        dict(
+            type="line",
+            x0=test_df.index[0],
+            y0=min_price,
+            x1=test_df.index[0],
+            y1=max_price,
+            line=dict(
+                color="Purple",
+                width=2,
+                dash="dash",
+                name='Train-Test Split'
+            ),
+        ),
+        dict(
+            type="line",
+            x0=forecast_data.index[0],
+            y0=min_price,
+            x1=forecast_data.index[0],
+            y1=max_price,
+            line=dict(
+                color="Black",
+                width=2,
+                dash="dash",
+                name='Forecast Start'
+            ),
+        )
+    ]
+
+    actual = history_points(data.index, data['Close'])
+    test_predicted = np.asarray(test_predicted)
+    predicted = history_points(test_df.index, test_predicted)
+
+    return {
+        'data': [
+            line_trace(
+                data.index[actual],
+                data['Close'].iloc[actual],
+                mode='lines',
+                name='Actual Prices',
+                line=dict(color='blue')
+            ),
+            line_trace(
+                test_df.index[predicted],
+                test_predicted[predicted],
+                mode='lines',
+                name='Predicted Prices',
+                line=dict(color='red')
+            ),
+            line_trace(
+                forecast_data.index,
+                forecast_data,
+                mode='lines',
+                name=f'{forecast_days}-Day Forecast',
+                line=dict(color='green')
+            ),
+            go.Scatter(
+                x=[test_df.index[0]],
+                y=[data['Close'].iloc[len(train_df)]],
+                mode='lines+markers',
+                name='Train-Test Split',
+                line=dict(color='purple', dash='dash')
+            ),
+            go.Scatter(
+                x=[forecast_data.index[0]],
+                y=[forecast_data.iloc[0]],
+                mode='lines+markers',
+                name='Forecast Start',
+                line=dict(color='black', dash='dash')
+            ),
+        ],
+        'layout': {
+            'title': {
+                'text': f'Predicted Stock Price of {ticker} using XGBoost',
+                'font': {'family': 'Prata', 'color': '#050A30'}
+            },
+            'yaxis': {
+                'title': 'Close Price',
+                'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
+                'tickfont': {'family': 'Hanken Grotesk'},
+                'range': [min_price, max_price],
+                'zeroline': False
+            },
+            'xaxis': {
+                'title': 'Date',
+                'type': 'date',
+                'tickformat': '%b %Y',
+                'tickmode': 'auto',
+                'nticks': 20,
+                'tickformatstops': [
+                    {'dtickrange': [None, 86400000], 'value': '%d %b %Y'},
+                    {'dtickrange': [86400000, 604800000], 'value': '%d %b %Y'},
+                    {'dtickrange': [604800000, "M1"], 'value': '%d %b %Y'},
+                    {'dtickrange': ["M1", "M6"], 'value': '%b %Y'},
+                    {'dtickrange': ["M6", None], 'value': '%b %Y'}
+                ],
+                'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
+                'tickfont': {'family': 'Hanken Grotesk'},
+                'showline': True,
+                'linewidth': 1,
+                'linecolor': 'black'
+            },
+            'plot_bgcolor': 'white',
+            'paper_bgcolor': 'white',
+            'font': {'family': 'Hanken Grotesk'},
+            'showlegend': True,
+            'height': 500,
+            'margin': dict(l=50, r=50, t=50, b=50),
+            'shapes': shapes
+        }
+    }
+
+def create_prophet_forecast_figure(data, ticker, forecast_days, min_price, max_price, data_prophet, forecast_data):
+    shapes = [
+        dict(
+            type="line",
+            x0=data_prophet['ds'].iloc[-1],
+            y0=min_price,
+            x1=data_prophet['ds'].iloc[-1],
+            y1=max_price,
+            line=dict(
+                color="Black",
+                width=2,
+                dash="dash",
+                name='Forecast Start'
+            ),
+        )
+    ]
+
+    actual = history_points(data_prophet['ds'], data_prophet['y'])
+    # The bands share the points of yhat so their fill lines up
+    history = forecast_data.iloc[:-forecast_days]
+    history = history.iloc[history_points(history['ds'], history['yhat'])]
+
+    return {
+        'data': [
+            line_trace(
+                data_prophet['ds'].iloc[actual],
+                data_prophet['y'].iloc[actual],
+                mode='lines',
+                name='Actual Prices',
+                line=dict(color='blue')
+            ),
+            line_trace(
+                history['ds'],
+                history['yhat'],
+                mode='lines',
+                name='Predicted Prices',
+                line=dict(color='red')
+            ),
+            line_trace(
+                history['ds'],
+                history['yhat_upper'],
+                fill=None,
+                mode='lines',
+                line=dict(color='orangered', width=0.4),
+                fillcolor='rgba(255, 69, 0, 0.2)',
+                name='Upper Confidence Interval',
+                showlegend=False
+            ),
+            line_trace(
+                history['ds'],
+                history['yhat_lower'],
+                fill='tonexty',
+                mode='lines',
+                line=dict(color='orangered', width=0.4),
+                fillcolor='rgba(255, 69, 0, 0.2)',
+                name='Lower Confidence Interval',
+                showlegend=False
+            ),
+            line_trace(
+                forecast_data['ds'][-forecast_days:],
+                forecast_data['yhat'][-forecast_days:],
+                mode='lines',
+                name=f'{forecast_days}-Day Forecast',
+                line=dict(color='green')
+            ),
+            line_trace(
+                forecast_data['ds'][-forecast_days:],
+                forecast_data['yhat_upper'][-forecast_days:],
+                fill=None,
+                mode='lines',
+                line=dict(color='green', width=0.4),
+                fillcolor='rgba(28, 184, 24, 0.25)',
+                name='Upper Confidence Interval',
+                showlegend=False
+            ),
+            line_trace(
+                forecast_data['ds'][-forecast_days:],
+                forecast_data['yhat_lower'][-forecast_days:],
+                fill='tonexty',
+                mode='lines',
+                line=dict(color='green', width=0.4),
+                fillcolor='rgba(28, 184, 24, 0.25)',
+                name='Lower Confidence Interval',
+                showlegend=False
+            ),
+            go.Scatter(
+                x=[data_prophet['ds'].iloc[-1]],
+                y=[data['Close'].iloc[-1]],
+                mode='lines+markers',
+                name='Forecast Start',
+                line=dict(color='black', dash='dash')
+            ),
+        ],
+        'layout': {
+            'title': {
+                'text': f'Predicted Stock Price of {ticker} using Prophet',
+                'font': {'family': 'Prata', 'color': '#050A30'}
+            },
+            'yaxis': {
+                'title': 'Close Price',
+                'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
+                'tickfont': {'family': 'Hanken Grotesk'},
+                'range': [max(0, min_price), max_price],
+                'zeroline': False
+            },
+            'xaxis': {
+                'title': 'Date',
+                'type': 'date',
+                'tickformat': '%b %Y',
+                'tickmode': 'auto',
+                'nticks': 20,
+                'tickformatstops': [
+                    {'dtickrange': [None, 86400000], 'value': '%d %b %Y'},
+                    {'dtickrange': [86400000, 604800000], 'value': '%d %b %Y'},
+                    {'dtickrange': [604800000, "M1"], 'value': '%d %b %Y'},
+                    {'dtickrange': ["M1", "M6"], 'value': '%b %Y'},
+                    {'dtickrange': ["M6", None], 'value': '%b %Y'}
+                ],
+                'titlefont': {'family': 'Hanken Grotesk', 'color': '#050A30'},
+                'tickfont': {'family': 'Hanken Grotesk'},
+                'showline': True,
+                'linewidth': 1,
+                'linecolor': 'black'
+            },
+            'plot_bgcolor': 'white',
+            'paper_bgcolor': 'white',
+            'font': {'family': 'Hanken Grotesk'},
+            'showlegend': True,
+            'height': 500,
+            'margin': dict(l=50, r=50, t=50, b=50),
+            'shapes': shapes
+        }
+    }
+
+def create_forecast_figure(data, ticker, model_type, forecast_days, forecast_result):
+    if model_type == 'XGBoost':
+        return create_xgboost_forecast_figure(data, ticker, forecast_days, *forecast_result)
+    elif model_type == 'Prophet':
+        return create_prophet_forecast_figure(data, ticker, forecast_days, *forecast_result)
+
+def figure_patch(old_figure, new_figure):
+    # Patch turning old_figure into new_figure that replaces only the traces and top-level layout entries that differ
+    patch = Patch()
+    old_data, new_data = old_figure['data'], new_figure['data']
+    if len(old_data) != len(new_data):
+        patch['data'] = new_data
+    else:
+        for i, (old_trace, new_trace) in enumerate(zip(old_data, new_data)):
+            if to_json_plotly(old_trace) != to_json_plotly(new_trace):
+                patch['data'][i] = new_trace
+    old_layout, new_layout = old_figure['layout'], new_figure['layout']
+    for key, value in new_layout.items():
+        if key not in old_layout or to_json_plotly(old_layout[key]) != to_json_plotly(value):
+            patch['layout'][key] = value
+    for key in old_layout.keys() - new_layout.keys():
+        del patch['layout'][key]
+    return patch
+
+def forecast_figure_update(figure, key, shown_key):
+    # What to send to a forecast graph showing the stored figure shown_key: nothing when it is the same figure, the
+    # changes when that figure is still in the result store, the whole figure otherwise
+    if shown_key == key:
+        return no_update
+    shown = load_result(shown_key) if shown_key else None
+    if shown is None:
+        return figure
+    return figure_patch(shown['figure'], figure)
+
+# Hyperparameter search used for XGBoost forecasts, one of models.xgboost_model.SEARCH_MODES
+XGBOOST_SEARCH = os.environ.get('XGBOOST_SEARCH', 'halving')
+
+# How XGBoost forecasts are produced: 'auto' rolls for ROLLING_TICKERS and runs recursively otherwise,
+# 'direct' predicts every horizon at once with a single multi-horizon model
+XGBOOST_FORECAST_MODES = ['auto', 'rolling', 'recursive', 'direct']
+XGBOOST_FORECAST_MODE = os.environ.get('XGBOOST_FORECAST_MODE', 'auto')
+ROLLING_TICKERS = ['AAPL', 'MSFT', 'NVDA', 'GOOGL', 'SMCI', 'MSTR']
+
+# How rolling forecasts retrain, one of models.xgboost_model.REFIT_STRATEGIES
+XGBOOST_REFIT = os.environ.get('XGBOOST_REFIT', 'full')
+if XGBOOST_REFIT not in REFIT_STRATEGIES:
+    raise ValueError(f"Unknown XGBoost refit strategy: {XGBOOST_REFIT}")
+
+# Prophet settings used for forecasts, one of models.prophet_model.PROPHET_PROFILES
+PROPHET_PROFILE = os.environ.get('PROPHET_PROFILE', 'default')
+
+def load_or_train_xgboost(data, ticker, search=XGBOOST_SEARCH, n_jobs=-1):
+    fingerprint = model_fingerprint(data)
+    model_key = f'xgboost-{search}'
+
+    bundle = load_model(ticker, model_key, fingerprint)
+    if bundle is not None:
+        train_df, test_df, _ = prepare_features(data)
+        scaler, best_model, feature_cols = bundle['scaler'], bundle['model'], bundle['feature_cols']
+        # Refits in the rolling forecast run with the cores of this job, not those of the job that trained the model
+        best_model.set_params(n_jobs=n_jobs if n_jobs != -1 else None)
+        report_progress('test')
+        y_test, y_pred_test = predict_test_set(best_model, scaler, test_df, feature_cols)
+        return train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test
+
+    report_progress('search')
+    train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test = prepare_and_train_model(data, search=search, n_jobs=n_jobs)
+    # Saved before the rolling forecast refits the model in place
+    save_model(ticker, model_key, fingerprint, {
+        'model': best_model,
+        'scaler': scaler,
+        'feature_cols': feature_cols,
+        'best_params': best_model.get_params()
+    })
+    return train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test
+
+def load_or_train_direct(data, ticker, n_jobs=-1):
+    fingerprint = model_fingerprint(data)
+    train_df, test_df, feature_cols = prepare_features(data)
+
+    bundle = load_model(ticker, 'xgboost-direct', fingerprint)
+    if bundle is not None:
+        return train_df, test_df, feature_cols, bundle['model']
+
+    report_progress('search')
+    direct_model = train_direct_model(train_df, test_df, n_jobs=n_jobs)
+    save_model(ticker, 'xgboost-direct', fingerprint, {'model': direct_model})
+    return train_df, test_df, feature_cols, direct_model
+
+def load_or_fit_prophet(data, ticker, profile=PROPHET_PROFILE):
+    fingerprint = model_fingerprint(data)
+    model_key = f'prophet-{profile}'
+
+    bundle = load_model(ticker, model_key, fingerprint)
+    if bundle is not None and 'history_forecast' in bundle:
+        return model_from_json(bundle['model']), prepare_prophet_data(data), bundle['history_forecast']
+
+    # Warm start from the last fit for this ticker, a refresh only adds a few days of data
+    report_progress('fit')
+    model, data_prophet = fit_prophet(data, init=load_params(ticker, f'{model_key}-init'), profile=profile)
+    history_forecast = predict_history(model)
+    save_model(ticker, model_key, fingerprint, {'model': model_to_json(model), 'history_forecast': history_forecast})
+    save_params(ticker, f'{model_key}-init', warm_start_params(model))
+    return model, data_prophet, history_forecast
+
+def resolve_forecast_mode(ticker, model_type, forecast_mode=XGBOOST_FORECAST_MODE):
+    if model_type == 'Prophet':
+        return 'prophet'
+    if forecast_mode not in XGBOOST_FORECAST_MODES:
+        raise ValueError(f"Unknown XGBoost forecast mode: {forecast_mode}")
+    if forecast_mode == 'auto':
+        return 'rolling' if ticker in ROLLING_TICKERS else 'recursive'
+    return forecast_mode
+
+# Longest horizon offered in the UI
+MAX_FORECAST_DAYS = 90
+# Modes whose shorter forecasts are the first days of a longer one from the same model. These compute
+# MAX_FORECAST_DAYS once and serve every horizon as a slice, rolling refits at every step and stays per horizon.
+PREFIX_CONSISTENT = {
+    'recursive': True,
+    'direct': True,
+    'rolling': False,
+    'prophet': True
+}
+
+def forecast_result_key(data, ticker, model_type, forecast_days, kind='figure', search=XGBOOST_SEARCH, refit=XGBOOST_REFIT,
+                        forecast_mode=XGBOOST_FORECAST_MODE, prophet_profile=PROPHET_PROFILE):
+    # Every setting that changes the forecast is part of the key, besides the data itself
+    if model_type == 'XGBoost':
+        forecast_mode = resolve_forecast_mode(ticker, model_type, forecast_mode)
+        settings = f'{search}-{forecast_mode}-{refit}' if forecast_mode == 'rolling' else f'{search}-{forecast_mode}'
+    else:
+        settings = prophet_profile
+    return result_key(ticker, model_type, settings, forecast_days, data_fingerprint(data), kind)
+
+def slice_forecast(model_type, forecast_result, forecast_days):
+    # forecast_result covers MAX_FORECAST_DAYS. Prophet's also starts with the fitted history, which is shorter than
+    # the data for profiles with a lookback, so its horizon is cut from the end.
+    if model_type == 'XGBoost':
+        return forecast_result[:-1] + (forecast_result[-1].iloc[:forecast_days],)
+    forecast_data = forecast_result[-1]
+    return forecast_result[:-1] + (forecast_data.iloc[:len(forecast_data) - MAX_FORECAST_DAYS + forecast_days],)
+
+# Model training and forecasting run in worker processes, TRAINING_WORKERS=0 runs them in the calling thread.
+# The worker and queue limits are shared by every process on the machine through lock files, each forecast click
+# runs in its own background callback process with its own executor.
+training_executor = TrainingExecutor(
+    max_workers=int(os.environ.get('TRAINING_WORKERS', 2)),
+    max_queue=int(os.environ.get('TRAINING_QUEUE_DEPTH', 8)),
+    timeout=float(os.environ.get('TRAINING_TIMEOUT', 600)),
+    memory_limit_mb=int(os.environ.get('TRAINING_MEMORY_LIMIT_MB', 0)) or None,
+    preload=['helpers.forecast_helpers'],
+    lock_dir=os.path.join(DATA_DIR, 'training')
+)
+
+# Cores shared by all concurrent training jobs on this machine, across web workers
+COMPUTE_CORES = int(os.environ.get('COMPUTE_CORES', os.cpu_count() or 1))
+compute_budget = ComputeBudget(
+    os.path.join(DATA_DIR, 'compute'),
+    total_cores=COMPUTE_CORES,
+    cores_per_job=int(os.environ.get('COMPUTE_CORES_PER_JOB', max(1, COMPUTE_CORES // max(1, training_executor.max_workers)))),
+    when_exhausted=os.environ.get('COMPUTE_WHEN_EXHAUSTED', 'queue'),
+    queue_timeout=float(os.environ.get('COMPUTE_QUEUE_TIMEOUT', 300))
+)
+
+# Progress stages of a forecast, as shown in the UI: stage -> (percent done, label)
+FORECAST_STAGES = {
+    'download': (5, 'Downloading prices'),
+    'queued': (10, 'Waiting for a training slot'),
+    'search': (20, 'Searching hyperparameters'),
+    'fit': (20, 'Fitting Prophet'),
+    'test': (60, 'Predicting the test set'),
+    'forecast': (80, 'Forecasting'),
+    'render': (95, 'Rendering')
+}
+
+def perform_forecast(data, ticker, model_type, forecast_days, search=XGBOOST_SEARCH, refit=XGBOOST_REFIT, forecast_mode=XGBOOST_FORECAST_MODE,
+                     prophet_profile=PROPHET_PROFILE, on_progress=None):
+    # on_progress receives the FORECAST_STAGES keys reached by the job
+    if on_progress is not None:
+        on_progress('queued')
+    if not PREFIX_CONSISTENT[resolve_forecast_mode(ticker, model_type, forecast_mode)] or forecast_days > MAX_FORECAST_DAYS:
+        return training_executor.run(_perform_forecast, data, ticker, model_type, forecast_days, search, refit, forecast_mode, prophet_profile,
+                                     on_progress=on_progress)
+
+    key = forecast_result_key(data, ticker, model_type, MAX_FORECAST_DAYS, 'forecast', search, refit, forecast_mode, prophet_profile)
+    forecast_result = load_result(key)
+    if forecast_result is None:
+        forecast_result = training_executor.run(_perform_forecast, data, ticker, model_type, MAX_FORECAST_DAYS, search, refit, forecast_mode,
+                                                prophet_profile, on_progress=on_progress)
+        save_result(key, forecast_result)
+    return slice_forecast(model_type, forecast_result, forecast_days)
+
+def _perform_forecast(data, ticker, model_type, forecast_days, search, refit, forecast_mode, prophet_profile):
+    # Prophet's optimizer is single-threaded, XGBoost jobs get the default share of the budget
+    with compute_budget.allocate(f'{model_type} {ticker}', cores=1 if model_type == 'Prophet' else None) as n_jobs:
+        return _run_forecast(data, ticker, model_type, forecast_days, search, refit, forecast_mode, prophet_profile, n_jobs)
+
+def _run_forecast(data, ticker, model_type, forecast_days, search, refit, forecast_mode, prophet_profile, n_jobs):
     min_price = max(0, data['Close'].min() * 0.9)
     max_price = data['Close'].max() * 1.1
 
     if model_type == 'XGBoost':
-        train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test = prepare_and_train_model(data)
+        forecast_mode = resolve_forecast_mode(ticker, model_type, forecast_mode)
 
-        if ticker in ['AAPL', 'MSFT', 'NVDA', 'GOOGL', 'SMCI', 'MSTR']:
-            test_predicted, forecast_data = forecast_with_rolling(best_model, train_df, test_df, feature_cols, scaler, forecast_days=forecast_days)
+        if forecast_mode == 'direct':
+            train_df, test_df, feature_cols, direct_model = load_or_train_direct(data, ticker, n_jobs)
+            report_progress('forecast')
+            test_predicted, forecast_data = forecast_direct(direct_model, train_df, test_df, forecast_days=forecast_days)
         else:
+            train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test = load_or_train_xgboost(data, ticker, search, n_jobs)
+
+        if forecast_mode == 'rolling':
+            report_progress('test')
+            refit_stats = {}
+            test_predicted, forecast_data = forecast_with_rolling(best_model, train_df, test_df, feature_cols, scaler, forecast_days=forecast_days,
+                                                                  refit=refit, refit_stats=refit_stats, progress=report_progress)
+            print(f"Rolling forecast for {ticker} ({refit} refit): {refit_stats['refits']} refits in {refit_stats['refit_seconds']:.2f}s")
+        elif forecast_mode == 'recursive':
+            report_progress('forecast')
             test_predicted, forecast_data = forecast_without_rolling(best_model, test_df, scaler, feature_cols, y_test, y_pred_test, forecast_days=forecast_days)
         
         return min_price, max_price, train_df, test_df, test_predicted, forecast_data
     
     elif model_type == 'Prophet':
-        model, data_prophet = fit_prophet(data)
-        forecast_data = forecast_prophet(model, data_prophet, forecast_days)
+        model, data_prophet, history_forecast = load_or_fit_prophet(data, ticker, prophet_profile)
+        report_progress('forecast')
+        forecast_data = forecast_prophet(model, data_prophet, forecast_days, history_forecast)
 
         return min_price, max_price, data_prophet, forecast_data
 
+def load_or_compute_forecast(data, ticker, model_type, forecast_days, on_progress=None, max_age=RESULT_FRESH_SECONDS):
+    # What the forecast page shows for these prices and settings, from the result store when the batch run or an
+    # earlier click made it at most max_age seconds ago, trained live otherwise. result['key'] is where it is stored.
+    key = forecast_result_key(data, ticker, model_type, forecast_days)
+    result = load_fresh_result(key, max_age)
+    if result is None:
+        forecast_result = perform_forecast(data, ticker, model_type, forecast_days, on_progress=on_progress)
+        if on_progress is not None:
+            on_progress('render')
+        result = {
+            'key': key,
+            'forecast_data': forecast_result[-1],
+            'figure': create_forecast_figure(data, ticker, model_type, forecast_days, forecast_result),
+            'computed_at': time.time()
+        }
+        save_result(key, result, latest=True)
+    return dict(result, key=result.get('key', key))
+
 def calculate_recommendations(data, model_type, forecast_data, earnings_percentage):
     today_price = data['Close'].iloc[-1]
     recommended_buy_price = today_price
@@ -0,0 +1,62 @@
+import os
+import time
+import diskcache
+from models.utils import DATA_DIR
+
+# Finished forecasts and their figures on local disk, shared by the web workers and the background callbacks
+RESULT_STORE_DIR = os.path.join(DATA_DIR, 'results')
+# Seconds a stored forecast is served, new prices change the key long before that
+RESULT_STORE_TTL = int(os.environ.get('RESULT_STORE_TTL', 24 * 3600))
+# Seconds a result is served for newer prices of the same ticker, model, settings and horizon, so a nightly batch
+# result is still used once intraday prices change the data fingerprint. 0 only serves exact matches.
+RESULT_FRESH_SECONDS = int(os.environ.get('RESULT_FRESH_SECONDS', 18 * 3600))
+
+_store = None
+_store_pid = None
+
+def _get_store():
+    # One handle per process, SQLite connections must not cross a fork
+    global _store, _store_pid
+    if _store is None or _store_pid != os.getpid():
+        _store = diskcache.Cache(RESULT_STORE_DIR)
+        _store_pid = os.getpid()
+    return _store
+
+def result_key(ticker, model_type, settings, forecast_days, fingerprint, kind='figure'):
+    # kind 'figure' holds what the page shows, kind 'forecast' the raw forecast it was sliced from
+    return f"{kind}:{ticker.upper()}:{model_type}:{settings}:{forecast_days}:{fingerprint}"
+
+def latest_key(key):
+    # Points to the newest result stored for the key's ticker, model, settings and horizon, whatever the prices
+    return key.rsplit(':', 1)[0] + ':latest'
+
+def load_result(key):
+    try:
+        return _get_store().get(key)
+    except Exception as e:
+        print(f"Error loading forecast result {key}: {e}")
+        return None
+
+def load_fresh_result(key, max_age=RESULT_FRESH_SECONDS):
+    # The result for key, or else the latest one for other prices when it was computed at most max_age seconds ago
+    result = load_result(key)
+    if result is not None or max_age <= 0:
+        return result
+    latest = load_result(latest_key(key))
+    result = load_result(latest) if latest is not None else None
+    if result is None or time.time() - result.get('computed_at', 0) > max_age:
+        return None
+    return result
+
+def save_result(key, result, latest=False):
+    try:
+        store = _get_store()
+        store.set(key, result, expire=RESULT_STORE_TTL)
+        if latest:
+            store.set(latest_key(key), key, expire=RESULT_STORE_TTL)
+    except Exception as e:
+        print(f"Error saving forecast result {key}: {e}")
+
+def stats():
+    store = _get_store()
+    return {'size': len(store), 'volume_bytes': store.volume()}
@@ -0,0 +1,83 @@
+import importlib.util
+import re
+import threading
+import time
+import flask
+import numpy as np
+import pandas as pd
+import plotly.io.json
+
+# orjson writes numpy arrays as they are and float32 values in their shortest form, the json fallback converts
+# element by element and would print float32 values with 17 digits
+FAST_JSON = importlib.util.find_spec('orjson') is not None
+if FAST_JSON:
+    plotly.io.json.config.default_engine = 'orjson'
+
+def plot_dates(values):
+    # Epoch milliseconds, read like ISO strings by plotly's date axes
+    return pd.DatetimeIndex(values).as_unit('ms').asi8
+
+def plot_values(values):
+    return np.asarray(values, dtype=np.float32 if FAST_JSON else np.float64)
+
+_to_json_plotly = plotly.io.json.to_json_plotly
+_stats = {}
+_stats_lock = threading.Lock()
+
+def _timed_to_json_plotly(plotly_object, pretty=False, engine=None):
+    # Dash encodes layouts and callback responses through plotly, the time is added to the request's encode total
+    start = time.perf_counter()
+    try:
+        return _to_json_plotly(plotly_object, pretty, engine)
+    finally:
+        if flask.has_request_context():
+            flask.g.encode_seconds = flask.g.get('encode_seconds', 0.0) + time.perf_counter() - start
+
+def _endpoint():
+    # Callbacks all post to one URL, they are told apart by their outputs
+    if flask.request.path.endswith('/_dash-update-component'):
+        body = flask.request.get_json(silent=True) or {}
+        output = re.sub(r'@[0-9a-f]+', '', str(body.get('output', ''))).strip('.')
+        if output:
+            return output
+    return flask.request.path
+
+def register_server_timing(server):
+    # Server-Timing header on every response with the total and the JSON encoding time, per endpoint totals in stats()
+    plotly.io.json.to_json_plotly = _timed_to_json_plotly
+
+    @server.before_request
+    def start_timing():
+        flask.g.request_start = time.perf_counter()
+        flask.g.encode_seconds = 0.0
+
+    @server.after_request
+    def add_server_timing(response):
+        start = flask.g.get('request_start')
+        if start is None:
+            return response
+        total_ms = (time.perf_counter() - start) * 1000
+        encode_ms = flask.g.get('encode_seconds', 0.0) * 1000
+        response.headers.add('Server-Timing', f'encode;dur={encode_ms:.1f}')
+        response.headers.add('Server-Timing', f'total;dur={total_ms:.1f}')
+
+        endpoint = _endpoint()
+        with _stats_lock:
+            stats = _stats.setdefault(endpoint, {'requests': 0, 'total_ms': 0.0, 'encode_ms': 0.0, 'bytes': 0})
+            stats['requests'] += 1
+            stats['total_ms'] += total_ms
+            stats['encode_ms'] += encode_ms
+            stats['bytes'] += response.content_length or 0
+        return response
+
+def stats():
+    with _stats_lock:
+        return {
+            endpoint: {
+                'requests': s['requests'],
+                'avg_total_ms': round(s['total_ms'] / s['requests'], 2),
+                'avg_encode_ms': round(s['encode_ms'] / s['requests'], 2),
+                'avg_bytes': s['bytes'] // s['requests']
+            }
+            for endpoint, s in _stats.items()
+        }
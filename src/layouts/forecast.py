@@ -1,6 +1,9 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 
+TICKERS = ['AAPL', 'AMZN', 'NVDA', 'ASML', 'TSLA', 'GOOGL', 'MARA', 'RIOT', 'MSFT', 'NFLX', 'SMCI', 'MSTR']
+FORECAST_PERIODS = {7: '1 Week', 30: '1 Month', 90: '3 Months'}
+
 layout = dbc.Container([
     html.H1("Forecast Stock Prices", className='fade-in-element', style={'text-align': 'center', 'margin-top': '40px', 'font-family': 'Prata'}),
     dbc.Row(
@@ -14,20 +17,7 @@ layout = dbc.Container([
             dbc.Col(
                 dcc.Dropdown(
                     id='index-dropdown',
-                    options=[
-                        {'label': 'AAPL', 'value': 'AAPL'},
-                        {'label': 'AMZN', 'value': 'AMZN'},
-                        {'label': 'NVDA', 'value': 'NVDA'},
-                        {'label': 'ASML', 'value': 'ASML'},
-                        {'label': 'TSLA', 'value': 'TSLA'},
-                        {'label': 'GOOGL', 'value': 'GOOGL'},
-                        {'label': 'MARA', 'value': 'MARA'},
-                        {'label': 'RIOT', 'value': 'RIOT'},
-                        {'label': 'MSFT', 'value': 'MSFT'},
-                        {'label': 'NFLX', 'value': 'NFLX'},
-                        {'label': 'SMCI', 'value': 'SMCI'},
-                        {'label': 'MSTR', 'value': 'MSTR'}
-                    ],
+                    options=[{'label': ticker, 'value': ticker} for ticker in TICKERS],
                     value='AAPL',
                     className='fade-in-element',
                     style={'margin-bottom': '10px'}
@@ -89,11 +79,7 @@ layout = dbc.Container([
             html.H4('Select the Forecast Period', className='fade-in-element', style={'margin': '20px 0', 'text-align': 'center'}),
             dcc.Dropdown(
                 id='forecast-period-dropdown',
-                options=[
-                    {'label': '1 Week', 'value': 7},
-                    {'label': '1 Month', 'value': 30},
-                    {'label': '3 Months', 'value': 90},
-                ],
+                options=[{'label': label, 'value': days} for days, label in FORECAST_PERIODS.items()],
                 value=30,
                 className='fade-in-element',
                 style={'margin-bottom': '20px'}
@@ -126,13 +112,22 @@ layout = dbc.Container([
                 ),
                 dbc.Row(
                     dbc.Col(
-                        dbc.Button("Generate Forecast", id='generate-forecast-btn', style={'display': 'block'}, className='fade-in-button'),
+                        [
+                            dbc.Button("Generate Forecast", id='generate-forecast-btn', style={'display': 'block'}, className='fade-in-button'),
+                            dbc.Button("Cancel", id='cancel-forecast-btn', color='secondary', outline=True, style={'display': 'none', 'margin-left': '10px'})
+                        ],
                         width="auto",
                         style={'display': 'flex', 'justify-content': 'center', 'margin-top': '20px'}
                     ),
                     className="mb-4 justify-content-center"
                 ),
+                dbc.Progress(id='forecast-progress', value=0, striped=True, animated=True,
+                             style={'display': 'none', 'height': '20px', 'margin-bottom': '20px', 'font-family': 'Hanken Grotesk'}),
             ], style={'text-align': 'center'}),
+            # Resolution and date window of the candles in price-graph
+            dcc.Store(id='price-graph-view'),
+            # Result store key of the figure in forecast-graph
+            dcc.Store(id='forecast-graph-state'),
             html.Div(
                 dcc.Graph(
                     id='price-graph',
@@ -0,0 +1,74 @@
+import os
+import time
+from contextlib import contextmanager
+from models.executor import TrainingError, SlotFiles
+
+class BudgetExhaustedError(TrainingError):
+    pass
+
+class ComputeBudget:
+    # Machine-wide core budget shared by every web worker and training process. Each core is a slot file, a job
+    # holds the slots it was granted with flock, so slots of a process that dies are released by the kernel.
+    def __init__(self, lock_dir, total_cores, cores_per_job, when_exhausted='queue', queue_timeout=300):
+        if when_exhausted not in ('queue', 'reject'):
+            raise ValueError(f"Unknown exhausted budget policy: {when_exhausted}")
+        self.lock_dir = lock_dir
+        self.total_cores = total_cores
+        self.cores_per_job = max(1, min(cores_per_job, total_cores))
+        self.when_exhausted = when_exhausted
+        self.queue_timeout = queue_timeout
+        self._slots = SlotFiles(lock_dir, 'core', total_cores)
+
+    def _try_acquire(self, job, cores):
+        held = []
+        record = {'job': job, 'pid': os.getpid(), 'since': time.time()}
+        while len(held) < cores:
+            f = self._slots.try_acquire(record)
+            if f is None:
+                break
+            held.append(f)
+        for f in held:
+            # Every slot of the allocation carries its size
+            self._slots.write(f, dict(record, cores=len(held)))
+        return held
+
+    @contextmanager
+    def allocate(self, job, cores=None):
+        # Grants up to cores slots (cores_per_job by default), fewer if that is all that is free. With no free
+        # slot at all the job waits up to queue_timeout seconds or is rejected, depending on when_exhausted.
+        cores = max(1, min(cores or self.cores_per_job, self.total_cores))
+        deadline = time.time() + self.queue_timeout
+        held = self._try_acquire(job, cores)
+        while not held:
+            if self.when_exhausted == 'reject' or time.time() > deadline:
+                raise BudgetExhaustedError(f"No free cores for {job}, all {self.total_cores} are allocated")
+            time.sleep(0.2)
+            held = self._try_acquire(job, cores)
+
+        try:
+            yield len(held)
+        finally:
+            for f in held:
+                self._slots.release(f)
+
+    def allocations(self):
+        allocations = {}
+        for record in self._slots.records():
+            if 'job' not in record:
+                record = {'job': None, 'pid': None, 'since': None, 'slot': record['slot']}
+            allocation = allocations.setdefault((record['pid'], record['job'], record['since']),
+                                                {key: value for key, value in record.items() if key != 'slot'})
+            allocation.setdefault('slots', []).append(record['slot'])
+        return list(allocations.values())
+
+    def stats(self):
+        allocations = self.allocations()
+        in_use = sum(len(allocation['slots']) for allocation in allocations)
+        return {
+            'total_cores': self.total_cores,
+            'cores_per_job': self.cores_per_job,
+            'in_use': in_use,
+            'free': self.total_cores - in_use,
+            'when_exhausted': self.when_exhausted,
+            'allocations': allocations
+        }
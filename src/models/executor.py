@@ -0,0 +1,360 @@
+import fcntl
+import itertools
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import signal
+import threading
+import time
+
+class TrainingError(Exception):
+    pass
+
+class QueueFullError(TrainingError):
+    pass
+
+class JobTimeoutError(TrainingError):
+    pass
+
+class JobCancelledError(TrainingError):
+    pass
+
+# Receives report_progress() stages of the job running in this process
+_progress_handler = None
+
+def report_progress(stage):
+    if _progress_handler is not None:
+        _progress_handler(stage)
+
+def _watch_parent(parent_pid):
+    # A job outlives nothing: once the web worker that submitted it is gone the result has nowhere to go
+    while True:
+        time.sleep(1)
+        try:
+            os.kill(parent_pid, 0)
+        except ProcessLookupError:
+            os.killpg(os.getpgrp(), signal.SIGKILL)
+
+def _run_job(conn, fn, args, kwargs, memory_limit_mb, parent_pid):
+    global _progress_handler
+    # Own process group, so cancelling also stops helper processes such as the cmdstan optimizer
+    os.setpgrp()
+    if memory_limit_mb:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    threading.Thread(target=_watch_parent, args=(parent_pid,), daemon=True).start()
+    _progress_handler = lambda stage: conn.send(('progress', stage))
+
+    try:
+        result = ('ok', fn(*args, **kwargs))
+    except BaseException as e:
+        result = ('error', e)
+    try:
+        conn.send(result)
+    except Exception as e:
+        conn.send(('error', TrainingError(f"{type(result[1]).__name__}: {result[1]} ({e})")))
+    conn.close()
+
+class SlotFiles:
+    # count slots shared by every process on the machine, one file each held with flock, so the slot of a process
+    # that dies is released by the kernel. A held slot file holds a JSON record of its holder.
+    def __init__(self, lock_dir, name, count):
+        self.lock_dir = lock_dir
+        self.name = name
+        self.count = count
+
+    def _path(self, slot):
+        return os.path.join(self.lock_dir, f"{self.name}-{slot}.lock")
+
+    def try_acquire(self, record):
+        # The open slot file, None when every slot is held
+        os.makedirs(self.lock_dir, exist_ok=True)
+        for slot in range(self.count):
+            f = open(self._path(slot), 'a+')
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                continue
+            self.write(f, record)
+            return f
+        return None
+
+    def write(self, f, record):
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(record))
+        f.flush()
+
+    def release(self, f):
+        f.seek(0)
+        f.truncate()
+        f.flush()
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+    def records(self):
+        records = []
+        for slot in range(self.count):
+            path = self._path(slot)
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                    continue
+                except BlockingIOError:
+                    pass
+                try:
+                    records.append(dict(json.loads(f.read()), slot=slot))
+                except ValueError:
+                    # Locked but not yet written
+                    records.append({'slot': slot})
+        return records
+
+class TrainingJob:
+    def __init__(self, job_id, fn, args, kwargs, timeout, on_progress=None):
+        self.job_id = job_id
+        self.name = getattr(fn, '__name__', str(fn))
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.stage = None
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._process = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+        self._ticket = None
+        self._slot = None
+
+    def cancel(self):
+        self._cancelled.set()
+        return not self._done.is_set()
+
+    def _progress(self, stage):
+        self.stage = stage
+        if self.on_progress is not None:
+            try:
+                self.on_progress(stage)
+            except Exception as e:
+                print(f"Error reporting progress of job {self.job_id}: {e}")
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.job_id} still {self.status}")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+class TrainingExecutor:
+    # Runs CPU-heavy training jobs in separate processes: at most max_workers at a time, at most max_queue
+    # waiting, each one killed after its timeout or on cancel() and optionally capped to memory_limit_mb.
+    # With a lock_dir the limits hold across every process on the machine using it, such as the processes Dash
+    # starts for background callbacks, otherwise within this process only.
+    def __init__(self, max_workers=2, max_queue=8, timeout=600, memory_limit_mb=None, preload=(), lock_dir=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.preload = list(preload)
+        self._context = None
+        self._slots = threading.BoundedSemaphore(max(1, max_workers))
+        self._worker_slots = None
+        self._tickets = None
+        if lock_dir is not None and max_workers > 0:
+            self._worker_slots = SlotFiles(lock_dir, 'worker', max_workers)
+            self._tickets = SlotFiles(lock_dir, 'ticket', max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._counts = {'completed': 0, 'failed': 0, 'timed_out': 0, 'cancelled': 0, 'rejected': 0}
+        # Job processes are not daemonic so joblib and cmdstanpy can start their own, kill them on exit
+        # before multiprocessing would wait for them
+        multiprocessing.util.Finalize(None, self.shutdown, exitpriority=10)
+
+    def _get_context(self):
+        # Forked from a clean server process rather than from a web worker with open sockets and threads
+        if self._context is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._context = multiprocessing.get_context(method)
+            if method == 'forkserver' and self.preload:
+                self._context.set_forkserver_preload(self.preload)
+        return self._context
+
+    def submit(self, fn, *args, timeout=None, on_progress=None, **kwargs):
+        # on_progress is called in the submitting process with every report_progress() stage of the job
+        with self._lock:
+            job = TrainingJob(next(self._ids), fn, args, kwargs, timeout if timeout is not None else self.timeout, on_progress)
+            if self._tickets is not None:
+                job._ticket = self._tickets.try_acquire({'job': job.name, 'pid': os.getpid(), 'submitted_at': job.submitted_at})
+                full = job._ticket is None
+            else:
+                full = len(self._jobs) >= self.max_workers + self.max_queue
+            if full:
+                self._counts['rejected'] += 1
+                raise QueueFullError(f"{self.max_workers + self.max_queue} training jobs already running or queued")
+            self._jobs[job.job_id] = job
+
+        if self.max_workers == 0:
+            # Inline mode for scripts and debugging, no isolation and no timeout
+            self._run_inline(job)
+        else:
+            threading.Thread(target=self._supervise, args=(job,), daemon=True).start()
+        return job
+
+    def run(self, fn, *args, timeout=None, on_progress=None, **kwargs):
+        return self.submit(fn, *args, timeout=timeout, on_progress=on_progress, **kwargs).result()
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.cancel() if job is not None else False
+
+    def _run_inline(self, job):
+        global _progress_handler
+        job.started_at = time.time()
+        job.status = 'running'
+        _progress_handler = job._progress
+        try:
+            job._value = job.fn(*job.args, **job.kwargs)
+            self._finish(job, 'completed')
+        except Exception as e:
+            self._finish(job, 'failed', e)
+        finally:
+            _progress_handler = None
+
+    def _acquire_slot(self, job):
+        # Waits for a worker slot, False once the job is cancelled while queued
+        while True:
+            if self._worker_slots is None:
+                if self._slots.acquire(timeout=0.1):
+                    return True
+            else:
+                job._slot = self._worker_slots.try_acquire({'job': job.name, 'pid': os.getpid(), 'started_at': time.time(), 'stage': None})
+                if job._slot is not None:
+                    return True
+                time.sleep(0.1)
+            if job._cancelled.is_set():
+                return False
+
+    def _release_slot(self, job):
+        if self._worker_slots is None:
+            self._slots.release()
+        elif job._slot is not None:
+            self._worker_slots.release(job._slot)
+            job._slot = None
+
+    def _supervise(self, job):
+        if not self._acquire_slot(job):
+            self._finish(job, 'cancelled', JobCancelledError(f"Job {job.job_id} cancelled while queued"))
+            return
+
+        try:
+            if job._cancelled.is_set():
+                self._finish(job, 'cancelled', JobCancelledError(f"Job {job.job_id} cancelled while queued"))
+                return
+
+            context = self._get_context()
+            receiver, sender = context.Pipe(duplex=False)
+            job._process = context.Process(target=_run_job, args=(sender, job.fn, job.args, job.kwargs, self.memory_limit_mb, os.getpid()),
+                                           name=f"training-{job.job_id}")
+            job.started_at = time.time()
+            job.status = 'running'
+            job._process.start()
+            sender.close()
+
+            deadline = job.started_at + job.timeout if job.timeout else None
+            while True:
+                if receiver.poll(0.1):
+                    try:
+                        outcome, value = receiver.recv()
+                    except EOFError:
+                        job._process.join()
+                        self._finish(job, 'failed', TrainingError(f"Job {job.job_id} exited with code {job._process.exitcode}"))
+                        return
+                    if outcome == 'progress':
+                        job._progress(value)
+                        if job._slot is not None:
+                            self._worker_slots.write(job._slot, {'job': job.name, 'pid': os.getpid(), 'started_at': job.started_at, 'stage': value})
+                        continue
+                    job._process.join()
+                    if outcome == 'ok':
+                        job._value = value
+                        self._finish(job, 'completed')
+                    else:
+                        self._finish(job, 'failed', value)
+                    return
+                if job._cancelled.is_set():
+                    self._kill(job)
+                    self._finish(job, 'cancelled', JobCancelledError(f"Job {job.job_id} cancelled"))
+                    return
+                if deadline is not None and time.time() > deadline:
+                    self._kill(job)
+                    self._finish(job, 'timed_out', JobTimeoutError(f"Job {job.job_id} exceeded {job.timeout}s"))
+                    return
+                if not job._process.is_alive() and not receiver.poll():
+                    self._finish(job, 'failed', TrainingError(f"Job {job.job_id} exited with code {job._process.exitcode}"))
+                    return
+        except Exception as e:
+            self._finish(job, 'failed', e)
+        finally:
+            self._release_slot(job)
+
+    def _kill(self, job):
+        try:
+            os.killpg(job._process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            job._process.kill()
+        job._process.join()
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.finished_at = time.time()
+        job._error = error
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            self._counts[status] += 1
+            if job._ticket is not None:
+                self._tickets.release(job._ticket)
+                job._ticket = None
+        job._done.set()
+
+    def stats(self):
+        # The counts are of jobs submitted by this process, running and queued cover the machine with a lock_dir
+        with self._lock:
+            jobs = list(self._jobs.values())
+            stats = dict(self._counts)
+        now = time.time()
+        if self._worker_slots is not None:
+            running = self._worker_slots.records()
+            stats['running'] = [{'name': record.get('job'), 'pid': record.get('pid'), 'stage': record.get('stage'),
+                                 'seconds': round(now - record['started_at'], 1) if record.get('started_at') else None} for record in running]
+            stats['queued'] = max(0, len(self._tickets.records()) - len(running))
+        else:
+            stats['running'] = [{'id': job.job_id, 'name': job.name, 'stage': job.stage, 'seconds': round(now - job.started_at, 1)}
+                                for job in jobs if job.status == 'running']
+            stats['queued'] = sum(job.status == 'queued' for job in jobs)
+        stats['max_workers'] = self.max_workers
+        stats['max_queue'] = self.max_queue
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        for job in jobs:
+            job._done.wait()
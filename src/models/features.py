@@ -0,0 +1,107 @@
+import numpy as np
+from scipy.signal import lfilter
+from models.streaming import RollingMean, EWMean
+
+# Indicators used as XGBoost features: name -> (kind, window, lag in rows)
+XGBOOST_FEATURES = {
+    'EMA_9': ('ema', 9, 1),
+    'SMA_5': ('sma', 5, 1),
+    'SMA_10': ('sma', 10, 1),
+    'SMA_15': ('sma', 15, 1),
+    'SMA_30': ('sma', 30, 1),
+    'SMA_50': ('sma', 50, 1),
+    'Returns': ('returns', 1, 0)
+}
+
+def _as_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+def _cumulative(values):
+    # Running sums and counts of the non-NaN values, shared by every window computed over the same series
+    valid = ~np.isnan(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+    return csum, ccount
+
+def _window_sums(cumulative, window):
+    csum, ccount = cumulative
+    return csum[window:] - csum[:-window], ccount[window:] - ccount[:-window]
+
+def sma(values, window, cumulative=None):
+    values = _as_array(values)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        if cumulative is None:
+            cumulative = _cumulative(values)
+        sums, counts = _window_sums(cumulative, window)
+        out[window - 1:] = np.where(counts == window, sums / window, np.nan)
+    return out
+
+def ema(values, span):
+    # Recursive EMA of pandas ewm(span=span, adjust=False).mean() as a first-order filter, for NaN-free input
+    values = _as_array(values)
+    if len(values) == 0:
+        return values.copy()
+    alpha = 2.0 / (span + 1.0)
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * values[0]])
+    return out
+
+def returns(values, window=1):
+    values = _as_array(values)
+    out = np.full(len(values), np.nan)
+    out[window:] = values[window:] / values[:-window] - 1
+    return out
+
+def rolling_std(values, window, ddof=1):
+    values = _as_array(values)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        # Centre first so the sums of squares do not cancel out
+        centred = values - np.nanmean(values)
+        sums, counts = _window_sums(_cumulative(centred), window)
+        squares, _ = _window_sums(_cumulative(centred ** 2), window)
+        variance = (squares - sums ** 2 / window) / (window - ddof)
+        out[window - 1:] = np.where(counts == window, np.sqrt(np.maximum(variance, 0)), np.nan)
+    return out
+
+_KINDS = {'sma': sma, 'ema': ema, 'returns': returns, 'std': rolling_std}
+
+def shift(values, lag):
+    if lag == 0:
+        return values
+    out = np.full(len(values), np.nan)
+    out[lag:] = values[:-lag]
+    return out
+
+def compute_features(values, indicators=XGBOOST_FEATURES):
+    values = _as_array(values)
+    cumulative = _cumulative(values)
+    features = {}
+    for name, (kind, window, lag) in indicators.items():
+        if kind == 'sma':
+            features[name] = shift(sma(values, window, cumulative), lag)
+        else:
+            features[name] = shift(_KINDS[kind](values, window), lag)
+    return features
+
+class FeatureStream:
+    # Streaming counterpart of compute_features for the moving averages: one push per new value,
+    # constant work per step, and values equal to pandas ewm/rolling over the whole pushed series
+    def __init__(self, indicators=XGBOOST_FEATURES):
+        self._states = {}
+        for name, (kind, window, _) in indicators.items():
+            if kind == 'sma':
+                self._states[name] = RollingMean(window)
+            elif kind == 'ema':
+                self._states[name] = EWMean(window)
+
+    def push(self, value):
+        for state in self._states.values():
+            state.push(value)
+
+    def extend(self, values):
+        for value in _as_array(values).tolist():
+            self.push(value)
+
+    def values(self):
+        return {name: state.value for name, state in self._states.items()}
@@ -1,19 +1,63 @@
+import numpy as np
+import pandas as pd
 from prophet import Prophet
+from prophet.serialize import model_to_json, model_from_json
 
-def fit_prophet(data):
-    # Prepare the Data for Prophet
+def prepare_prophet_data(data):
     data_prophet = data.reset_index()
-    data_prophet = data_prophet.rename(columns={'Date': 'ds', 'Close': 'y'})
+    return data_prophet.rename(columns={'Date': 'ds', 'Close': 'y'})
+
+# Prophet settings by profile: 'default' fits the whole history with daily seasonality, 'fast' fits the last
+# lookback_days only, with the seasonalities business-day prices can show, fewer uncertainty samples and a capped LBFGS run
+PROPHET_PROFILES = {
+    'default': {
+        'lookback_days': None,
+        'model': {'daily_seasonality': True},
+        'fit': {}
+    },
+    'fast': {
+        'lookback_days': 3 * 365,
+        'model': {'daily_seasonality': False, 'weekly_seasonality': True, 'yearly_seasonality': True, 'uncertainty_samples': 200},
+        'fit': {'algorithm': 'LBFGS', 'iter': 1000}
+    }
+}
+
+# Stan parameters carried from one fit to the next, Prophet falls back to its own init for any whose shape changed
+WARM_START_PARAMS = ['k', 'm', 'delta', 'beta', 'sigma_obs']
+
+def warm_start_params(model):
+    return {name: np.ravel(model.params[name]).tolist() for name in WARM_START_PARAMS}
+
+def fit_prophet(data, init=None, profile='default'):
+    if profile not in PROPHET_PROFILES:
+        raise ValueError(f"Unknown Prophet profile: {profile}")
+    settings = PROPHET_PROFILES[profile]
 
-    # Create and fit Prophet model
-    model = Prophet(daily_seasonality=True)
-    model.fit(data_prophet)
+    # Prepare the Data for Prophet
+    data_prophet = prepare_prophet_data(data)
+    train_prophet = data_prophet
+    if settings['lookback_days'] is not None:
+        train_prophet = data_prophet[data_prophet['ds'] > data_prophet['ds'].iloc[-1] - pd.Timedelta(days=settings['lookback_days'])]
+
+    # Create and fit Prophet model, starting the optimizer from a previous fit's parameters when given
+    model = Prophet(**settings['model'])
+    fit_kwargs = dict(settings['fit'])
+    if init is not None:
+        fit_kwargs['init'] = {name: np.asarray(init[name]) if name in ('delta', 'beta') else init[name][0] for name in WARM_START_PARAMS}
+    model.fit(train_prophet, **fit_kwargs)
     
     return model, data_prophet
 
-def forecast_prophet(model, data_prophet, forecast_days=90):
-    # Create future dataframe for the next forecast_days
-    future = model.make_future_dataframe(periods=forecast_days)
-    forecast = model.predict(future)
+def predict_history(model):
+    # In-sample predictions only depend on the fitted model, so they are computed once and reused for every horizon
+    return model.predict(model.history[['ds']])
+
+def forecast_prophet(model, data_prophet, forecast_days=90, history_forecast=None):
+    if history_forecast is None:
+        history_forecast = predict_history(model)
+
+    # Create future dataframe for the next forecast_days, without the history rows already predicted
+    future = model.make_future_dataframe(periods=forecast_days, include_history=False)
+    forecast = pd.concat([history_forecast, model.predict(future)], ignore_index=True)
 
     return forecast
@@ -0,0 +1,83 @@
+import os
+import glob
+import hashlib
+import json
+import pickle
+import pandas as pd
+from models.utils import DATA_DIR, write_atomic
+
+# Trained models on local disk, keyed by ticker, model key and training data fingerprint
+MODEL_REGISTRY_DIR = os.path.join(DATA_DIR, 'models')
+
+# Prices are dated in exchange time, the row of the current session moves with every refresh until the close
+MARKET_TIMEZONE = os.environ.get('MARKET_TIMEZONE', 'America/New_York')
+MARKET_CLOSE = pd.Timedelta(os.environ.get('MARKET_CLOSE', '16:00') + ':00')
+
+def data_fingerprint(data):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes()).hexdigest()
+    return f"{data.index[-1]:%Y%m%d}-{len(data)}-{digest[:16]}"
+
+def finished_sessions(data, now=None):
+    now = pd.Timestamp.now(tz=MARKET_TIMEZONE) if now is None else now
+    today = pd.Timestamp(now.date())
+    if len(data) and data.index[-1] >= today and now - now.normalize() < MARKET_CLOSE:
+        return data[data.index < today]
+    return data
+
+def model_fingerprint(data, now=None):
+    # Models are keyed by the finished sessions only, so refreshes during the trading day reuse the model trained on
+    # the first one instead of retraining on every new price
+    return data_fingerprint(finished_sessions(data, now))
+
+def _model_path(ticker, model_key, fingerprint):
+    return os.path.join(MODEL_REGISTRY_DIR, ticker.upper(), f"{model_key}__{fingerprint}.pkl")
+
+def load_model(ticker, model_key, fingerprint):
+    path = _model_path(ticker, model_key, fingerprint)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Error loading {model_key} model for {ticker}: {e}")
+        return None
+
+def save_model(ticker, model_key, fingerprint, bundle):
+    path = _model_path(ticker, model_key, fingerprint)
+
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    write_atomic(path, write)
+
+    # Models trained on older data for the same ticker and key are never loaded again
+    for old_path in glob.glob(_model_path(ticker, model_key, '*')):
+        if old_path != path and not old_path.endswith('.tmp'):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+def _params_path(ticker, params_key):
+    return os.path.join(MODEL_REGISTRY_DIR, ticker.upper(), f"{params_key}.json")
+
+def load_params(ticker, params_key):
+    # Parameters kept across data refreshes, unlike models they are not tied to a fingerprint
+    path = _params_path(ticker, params_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading {params_key} for {ticker}: {e}")
+        return None
+
+def save_params(ticker, params_key, params):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(params, f)
+
+    write_atomic(_params_path(ticker, params_key), write)
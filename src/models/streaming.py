@@ -0,0 +1,141 @@
+import copy
+import math
+import numpy as np
+
+class RollingMean:
+    # Fixed-window mean over a ring buffer. Keeps the same compensated running sums as
+    # pandas rolling(window).mean(), so pushing a series value by value gives identical results.
+    def __init__(self, window):
+        self.window = window
+        self._buffer = np.empty(window)
+        self._count = 0
+        self._nobs = 0
+        self._neg_ct = 0
+        self._sum = 0.0
+        self._compensation_add = 0.0
+        self._compensation_remove = 0.0
+        self._same_count = 0
+        self._prev_value = math.nan
+
+    def push(self, value):
+        slot = self._count % self.window
+        if self._count >= self.window:
+            self._remove(self._buffer[slot])
+        self._add(value)
+        self._buffer[slot] = value
+        self._count += 1
+
+    def _add(self, value):
+        if value != value:
+            return
+        self._nobs += 1
+        y = value - self._compensation_add
+        t = self._sum + y
+        self._compensation_add = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg_ct += 1
+        if value == self._prev_value:
+            self._same_count += 1
+        else:
+            self._same_count = 1
+        self._prev_value = value
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self._nobs -= 1
+        y = -value - self._compensation_remove
+        t = self._sum + y
+        self._compensation_remove = t - self._sum - y
+        self._sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg_ct -= 1
+
+    @property
+    def value(self):
+        if self._nobs < self.window:
+            return math.nan
+        result = self._sum / self._nobs
+        if self._same_count >= self._nobs:
+            result = self._prev_value
+        elif self._neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self._neg_ct == self._nobs and result > 0:
+            result = 0.0
+        return result
+
+class EWMean:
+    # Running state of pandas ewm(span=span, adjust=False).mean()
+    def __init__(self, span):
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self._old_wt = 1.0 - self.alpha
+        self._weighted = math.nan
+        self._started = False
+
+    def push(self, value):
+        if not self._started:
+            self._weighted = value
+            self._started = True
+        elif self._weighted == self._weighted:
+            if value == value and self._weighted != value:
+                self._weighted = (self._old_wt * self._weighted + self.alpha * value) / (self._old_wt + self.alpha)
+        elif value == value:
+            self._weighted = value
+
+    @property
+    def value(self):
+        return self._weighted
+
+class RollingScaler:
+    # StandardScaler statistics over a sliding window of rows, updated as rows enter and leave the window
+    def __init__(self, window, n_features):
+        self.window = window
+        self._buffer = np.empty((window, n_features))
+        self._count = 0
+        self.n_samples_seen_ = 0
+        self._mean = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+
+    def push(self, row):
+        slot = self._count % self.window
+        if self.n_samples_seen_ == self.window:
+            old_row = self._buffer[slot].copy()
+            new_mean = self._mean + (row - old_row) / self.window
+            self._m2 += (row - old_row) * (row - new_mean + old_row - self._mean)
+            self._mean = new_mean
+        else:
+            self.n_samples_seen_ += 1
+            delta = row - self._mean
+            self._mean = self._mean + delta / self.n_samples_seen_
+            self._m2 += delta * (row - self._mean)
+        self._buffer[slot] = row
+        self._count += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.push(row)
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    @property
+    def mean_(self):
+        return self._mean
+
+    @property
+    def var_(self):
+        return np.maximum(self._m2 / self.n_samples_seen_, 0)
+
+    @property
+    def scale_(self):
+        var = self.var_
+        # Same constant-feature handling as StandardScaler
+        eps = np.finfo(np.float64).eps
+        constant = var <= self.n_samples_seen_ * eps * var + (self.n_samples_seen_ * self._mean * eps) ** 2
+        scale = np.sqrt(var)
+        scale[constant | (scale < 10 * eps)] = 1.0
+        return scale
+
+    def transform(self, X):
+        return (X - self._mean) / self.scale_
@@ -1,9 +1,137 @@
+import os
+import threading
+import time
 import yfinance as yf
+import numpy as np
 import pandas as pd
 
-def download_data(ticker, start_date="2015-01-01"):
+# Local storage for downloaded prices and trained artifacts
+DATA_DIR = os.environ.get('TREND_ANALYZER_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'))
+PRICE_STORE_DIR = os.path.join(DATA_DIR, 'prices')
+# Seconds a stored history is trusted before asking yfinance for newer rows
+PRICE_STORE_TTL = int(os.environ.get('PRICE_STORE_TTL', 900))
+# Coarser candles stored next to the daily prices for long chart ranges: resolution -> pandas resample rule
+OHLC_RESOLUTIONS = {'W': 'W-FRI', 'M': 'ME'}
+OHLC_AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Adj Close': 'last', 'Volume': 'sum'}
+
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+def _store_lock(ticker):
+    with _store_locks_guard:
+        return _store_locks.setdefault(ticker, threading.Lock())
+
+def _store_path(ticker, resolution='D'):
+    if resolution == 'D':
+        return os.path.join(PRICE_STORE_DIR, f"{ticker.upper()}.parquet")
+    return os.path.join(PRICE_STORE_DIR, f"{ticker.upper()}.{resolution}.parquet")
+
+def write_atomic(path, write):
+    # Write to a temporary file first so readers in other workers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def load_prices(ticker, resolution='D'):
+    path = _store_path(ticker, resolution)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Error reading price store for {ticker}: {e}")
+        return None
+
+def resample_ohlc(data, resolution):
+    data = data.dropna(subset=['Close'])
+    rule = OHLC_RESOLUTIONS[resolution]
+    bars = data.resample(rule).agg({column: how for column, how in OHLC_AGGREGATIONS.items() if column in data.columns})
+    # Each candle sits on the last trading day of its period, period ends can fall on a weekend
+    bars.index = data.index.to_series().resample(rule).last()
+    return bars.dropna()
+
+def save_prices(ticker, data):
+    write_atomic(_store_path(ticker), lambda path: data.to_parquet(path))
+    for resolution in OHLC_RESOLUTIONS:
+        bars = resample_ohlc(data, resolution)
+        write_atomic(_store_path(ticker, resolution), lambda path: bars.to_parquet(path))
+
+def load_ohlc(ticker, resolution, start_date="2015-01-01"):
+    # Weekly or monthly candles of the stored prices, resampled on the spot for stores written before they existed
+    bars = load_prices(ticker, resolution)
+    if bars is None:
+        data = load_prices(ticker)
+        if data is None:
+            return None
+        bars = resample_ohlc(data, resolution)
+        write_atomic(_store_path(ticker, resolution), lambda path: bars.to_parquet(path))
+    return bars[bars.index >= pd.Timestamp(start_date)]
+
+def _download(ticker, start_date):
     data = yf.download(ticker, start=start_date)
     data.index = pd.to_datetime(data.index)
+    # The start asked for, the first row is later for holidays and for tickers listed after it
+    data.attrs['start_date'] = start_date
+    return data
+
+def _covers(stored, start):
+    # Stores written before the requested start was recorded count as complete when they begin within a week of it
+    if 'start_date' in stored.attrs:
+        return pd.Timestamp(stored.attrs['start_date']) <= start
+    return stored.index[0] <= start + pd.offsets.BDay(5)
+
+def _rescaled(stored, new_rows, day):
+    # yfinance rescales the whole history after a split or dividend, a closed day then no longer matches the store
+    if day not in new_rows.index:
+        return True
+    columns = [column for column in ('Close', 'Adj Close') if column in stored.columns and column in new_rows.columns]
+    return not np.allclose(stored.loc[day, columns].to_numpy(dtype=float), new_rows.loc[day, columns].to_numpy(dtype=float), rtol=1e-5)
+
+def update_prices(ticker, start_date="2015-01-01"):
+    start = pd.Timestamp(start_date)
+    path = _store_path(ticker)
+
+    with _store_lock(ticker):
+        stored = load_prices(ticker)
+        if stored is not None and stored.empty:
+            stored = None
+
+        if stored is not None and not _covers(stored, start):
+            # The store does not reach back far enough, download the full range again
+            stored = None
+
+        if stored is not None and time.time() - os.path.getmtime(path) < PRICE_STORE_TTL:
+            return stored
+
+        if stored is None:
+            data = _download(ticker, start_date)
+        else:
+            # Fetch from the second to last stored day: the last one may have been stored before the close, the one
+            # before it is final and is compared to detect a rescaled history
+            check_day = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+            new_rows = yf.download(ticker, start=check_day.strftime('%Y-%m-%d'))
+            new_rows.index = pd.to_datetime(new_rows.index)
+            if not new_rows.empty and _rescaled(stored, new_rows, check_day):
+                print(f"Price history of {ticker} was rescaled, downloading it again")
+                data = _download(ticker, stored.attrs.get('start_date', start_date))
+            else:
+                data = pd.concat([stored, new_rows])
+                data = data[~data.index.duplicated(keep='last')].sort_index()
+                data.attrs['start_date'] = stored.attrs.get('start_date', start_date)
+
+        if not data.empty:
+            save_prices(ticker, data)
+        return data
+
+def download_data(ticker, start_date="2015-01-01"):
+    data = update_prices(ticker, start_date)
+    data = data[data.index >= pd.Timestamp(start_date)].copy()
+    data.index = pd.to_datetime(data.index)
     data = data.asfreq('B')  # 'B' indicates business days
     data = data.ffill().dropna()  # Forward fill NaN values and drop remaining NaNs
-    return data
\ No newline at end of file
+    return data
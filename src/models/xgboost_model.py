@@ -3,22 +3,129 @@ import pandas as pd
 import numpy as np
 import yfinance as yf
 import xgboost as xgb
-from sklearn.metrics import mean_squared_error
 from sklearn.preprocessing import StandardScaler
 import matplotlib.pyplot as plt
-from sklearn.model_selection import GridSearchCV
+import time
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingRandomSearchCV, ParameterSampler, TimeSeriesSplit, cross_val_score
+from models.streaming import RollingScaler
+from models.features import XGBOOST_FEATURES, compute_features, FeatureStream
 
 # Set random seed for reproducibility
 np.random.seed(42)
 
-def prepare_and_train_model(data):
-    data['EMA_9'] = data['Adj Close'].ewm(span=9, adjust=False).mean().shift(1)
-    data['SMA_5'] = data['Adj Close'].rolling(window=5).mean().shift(1)
-    data['SMA_10'] = data['Adj Close'].rolling(window=10).mean().shift(1)
-    data['SMA_15'] = data['Adj Close'].rolling(window=15).mean().shift(1)
-    data['SMA_30'] = data['Adj Close'].rolling(window=30).mean().shift(1)
-    data['SMA_50'] = data['Adj Close'].rolling(window=50).mean().shift(1)
-    data['Returns'] = data['Adj Close'].pct_change()
+PARAM_GRID = {
+    'n_estimators': [50, 100, 150],
+    'learning_rate': [0.01, 0.05, 0.1],
+    'max_depth': [3, 5, 7],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0],
+    'gamma': [0, 0.1, 0.2],
+    'min_child_weight': [1, 5, 10]
+}
+
+# Search modes: 'grid' fits every combination, 'halving' and 'random' stop at max_fits and
+# 'timeseries' validates on forward-chaining splits with early stopping choosing the boosting rounds
+SEARCH_MODES = ['grid', 'halving', 'random', 'timeseries']
+
+def _threads(n_jobs):
+    # XGBoost thread count for n_jobs cores, -1 leaves XGBoost to use every core
+    return None if n_jobs == -1 else n_jobs
+
+def _candidate_threads(n_jobs):
+    # Searches already fit n_jobs candidates in parallel, so each fit gets a single thread within a budget
+    return None if n_jobs == -1 else 1
+
+def _grid_search(X_train, y_train, cv, n_jobs=-1):
+    xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=_candidate_threads(n_jobs))
+    grid_search = GridSearchCV(estimator=xgb_model, param_grid=PARAM_GRID, 
+                               scoring='neg_mean_squared_error', cv=cv, verbose=1, n_jobs=n_jobs)
+    grid_search.fit(X_train, y_train)
+    return grid_search.best_estimator_.set_params(n_jobs=_threads(n_jobs))
+
+def _halving_search(X_train, y_train, cv, max_fits, factor=3, n_jobs=-1):
+    # Successive halving with boosting rounds as the resource: every round keeps the best
+    # third of the candidates and gives them three times as many trees
+    max_rounds = max(PARAM_GRID['n_estimators'])
+    min_rounds = max_rounds // factor ** 2
+    n_iterations = 1
+    while min_rounds * factor ** n_iterations <= max_rounds:
+        n_iterations += 1
+
+    # Largest candidate pool whose total number of fits stays within the budget
+    n_candidates = factor
+    while cv * sum(-(-(n_candidates + 1) // factor ** i) for i in range(n_iterations)) <= max_fits:
+        n_candidates += 1
+
+    param_distributions = {k: v for k, v in PARAM_GRID.items() if k != 'n_estimators'}
+    xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=_candidate_threads(n_jobs))
+    halving_search = HalvingRandomSearchCV(estimator=xgb_model, param_distributions=param_distributions,
+                                           n_candidates=n_candidates, resource='n_estimators', factor=factor,
+                                           min_resources=min_rounds, max_resources=max_rounds,
+                                           scoring='neg_mean_squared_error', cv=cv, verbose=1, n_jobs=n_jobs, random_state=42)
+    halving_search.fit(X_train, y_train)
+    return halving_search.best_estimator_.set_params(n_jobs=_threads(n_jobs))
+
+def _random_search(X_train, y_train, cv, max_fits, time_budget=None, n_jobs=-1):
+    # Randomized search that stops at the fit budget or once time_budget seconds have passed
+    start = time.perf_counter()
+    best_score, best_params = -np.inf, None
+    for params in ParameterSampler(PARAM_GRID, n_iter=max(1, max_fits // cv), random_state=42):
+        xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=_candidate_threads(n_jobs), **params)
+        score = cross_val_score(xgb_model, X_train, y_train, scoring='neg_mean_squared_error', cv=cv, n_jobs=n_jobs).mean()
+        if best_params is None or score > best_score:
+            best_score, best_params = score, params
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            break
+
+    best_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=_threads(n_jobs), **best_params)
+    best_model.fit(X_train, y_train)
+    return best_model
+
+def _timeseries_search(X_train, y_train, cv, max_fits, time_budget=None, max_rounds=500, early_stopping_rounds=20, n_jobs=-1):
+    # Every fold trains on the past and validates on the slice right after it, early stopping on
+    # that slice replaces the n_estimators sweep
+    start = time.perf_counter()
+    X_train, y_train = np.asarray(X_train), np.asarray(y_train)
+    splitter = TimeSeriesSplit(n_splits=cv)
+    param_distributions = {k: v for k, v in PARAM_GRID.items() if k != 'n_estimators'}
+
+    best_score, best_params, best_rounds = np.inf, None, None
+    for params in ParameterSampler(param_distributions, n_iter=max(1, max_fits // cv), random_state=42):
+        fold_mse, fold_rounds = [], []
+        for train_idx, val_idx in splitter.split(X_train):
+            xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=max_rounds, eval_metric='rmse',
+                                         early_stopping_rounds=early_stopping_rounds, n_jobs=_threads(n_jobs), **params)
+            xgb_model.fit(X_train[train_idx], y_train[train_idx], eval_set=[(X_train[val_idx], y_train[val_idx])], verbose=False)
+            fold_mse.append(xgb_model.best_score ** 2)
+            fold_rounds.append(xgb_model.best_iteration + 1)
+
+        score = np.mean(fold_mse)
+        if best_params is None or score < best_score:
+            best_score, best_params, best_rounds = score, params, int(round(np.mean(fold_rounds)))
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            break
+
+    best_model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=best_rounds, n_jobs=_threads(n_jobs), **best_params)
+    best_model.fit(X_train, y_train)
+    return best_model
+
+def search_best_model(X_train, y_train, search='halving', max_fits=120, time_budget=None, cv=3, n_jobs=-1):
+    if search == 'grid':
+        return _grid_search(X_train, y_train, cv, n_jobs=n_jobs)
+    elif search == 'halving':
+        return _halving_search(X_train, y_train, cv, max_fits, n_jobs=n_jobs)
+    elif search == 'random':
+        return _random_search(X_train, y_train, cv, max_fits, time_budget, n_jobs=n_jobs)
+    elif search == 'timeseries':
+        return _timeseries_search(X_train, y_train, cv, max_fits, time_budget, n_jobs=n_jobs)
+    raise ValueError(f"Unknown search mode: {search}")
+
+def prepare_features(data):
+    # Features go on a copy, the caller's prices also key the caches
+    data = data.copy()
+    for name, values in compute_features(data['Adj Close'], XGBOOST_FEATURES).items():
+        data[name] = values
     data['Adj Close'] = data['Adj Close'].shift(-1)
     data = data.dropna()
 
@@ -27,129 +134,267 @@ def prepare_and_train_model(data):
     train_df = data.iloc[:train_size]
     test_df = data.iloc[train_size:]
 
-    # Define features and target
-    feature_cols = ['EMA_9', 'SMA_5', 'SMA_10', 'SMA_15', 'SMA_30', 'SMA_50', 'Returns']
+    # Define features
+    feature_cols = list(XGBOOST_FEATURES)
+
+    return train_df, test_df, feature_cols
+
+def predict_test_set(best_model, scaler, test_df, feature_cols):
+    X_test_scaled = scaler.transform(test_df[feature_cols].fillna(0))
+    y_pred_log_xgb = best_model.predict(X_test_scaled)
+
+    # Transform Predictions Back to Original Scale
+    return test_df['Adj Close'], np.exp(y_pred_log_xgb)
+
+def prepare_and_train_model(data, search='halving', max_fits=120, time_budget=None, n_jobs=-1):
+    train_df, test_df, feature_cols = prepare_features(data)
+
     X_train = train_df[feature_cols].fillna(0)
-    X_test = test_df[feature_cols].fillna(0)
-    y_test = test_df['Adj Close']
     y_train_log = np.log(train_df['Adj Close'])
 
     # Scale the features
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    # Train the model using Grid Search
-    param_grid = {
-        'n_estimators': [50, 100, 150],
-        'learning_rate': [0.01, 0.05, 0.1],
-        'max_depth': [3, 5, 7],
-        'subsample': [0.8, 1.0],
-        'colsample_bytree': [0.8, 1.0],
-        'gamma': [0, 0.1, 0.2],
-        'min_child_weight': [1, 5, 10]
-    }
-    xgb_model = xgb.XGBRegressor(objective='reg:squarederror')
-    grid_search = GridSearchCV(estimator=xgb_model, param_grid=param_grid, 
-                               scoring='neg_mean_squared_error', cv=3, verbose=1, n_jobs=-1)
-    grid_search.fit(X_train_scaled, y_train_log)
-
-    # Get the best model
-    best_model = grid_search.best_estimator_
 
-    y_pred_log_xgb = best_model.predict(X_test_scaled)
+    # Train the model with the selected hyperparameter search
+    best_model = search_best_model(X_train_scaled, y_train_log, search=search, max_fits=max_fits, time_budget=time_budget, n_jobs=n_jobs)
 
-    # Transform Predictions Back to Original Scale
-    y_pred_test = np.exp(y_pred_log_xgb)
+    y_test, y_pred_test = predict_test_set(best_model, scaler, test_df, feature_cols)
 
     return train_df, test_df, scaler, best_model, feature_cols, y_test, y_pred_test
 
 def forecast_without_rolling(best_model, test_df, scaler, feature_cols, y_test, y_pred_test, forecast_days=30):
-    forecast_input = test_df.copy()
-    forecast_df = pd.DataFrame(columns=test_df.columns)
-    
+    # Carry the indicator state forward one step at a time instead of recomputing every window over the growing history
+    stream = FeatureStream(XGBOOST_FEATURES)
+    stream.extend(test_df['Adj Close'])
+    returns = test_df['Returns'].iloc[-1]
+
+    # XGBoost predicts in float32
+    forecast = np.empty(forecast_days, dtype=np.float32)
+    forecast_dates = []
+    next_date = test_df.index[-1]
     for i in range(forecast_days):
-        last_date = forecast_input.index[-1]
-        next_date = last_date + pd.offsets.BDay(1)
-        
-        ema_9 = forecast_input['Adj Close'].ewm(span=9, adjust=False).mean().iloc[-1]
-        sma_5 = forecast_input['Adj Close'].rolling(window=5).mean().iloc[-1]
-        sma_10 = forecast_input['Adj Close'].rolling(window=10).mean().iloc[-1]
-        sma_15 = forecast_input['Adj Close'].rolling(window=15).mean().iloc[-1]
-        sma_30 = forecast_input['Adj Close'].rolling(window=30).mean().iloc[-1]
-        sma_50 = forecast_input['Adj Close'].rolling(window=50).mean().iloc[-1]
-        returns = forecast_input['Returns'].iloc[-1]
-        
-        feature_row = {
-            'EMA_9': ema_9, 'SMA_5': sma_5, 'SMA_10': sma_10,
-            'SMA_15': sma_15, 'SMA_30': sma_30, 'SMA_50': sma_50, 'Returns': returns
-        }
-        
-        input_features = pd.DataFrame([feature_row], index=[next_date], columns=feature_cols)
-        input_scaled = scaler.transform(input_features.fillna(0))
-        
-        pred_log_xgb = best_model.predict(input_scaled)
-        predicted_close = np.exp(pred_log_xgb)
-        
-        feature_row['Adj Close'] = predicted_close
-        forecast_input = pd.concat([forecast_input, pd.DataFrame(feature_row, index=[next_date])])
-        if not pd.DataFrame(feature_row).dropna(how='all').empty:
-            forecast_df = pd.concat([forecast_df, pd.DataFrame(feature_row, index=[next_date])])
+        next_date = next_date + pd.offsets.BDay(1)
+        forecast_dates.append(next_date)
 
-    return pd.Series(y_pred_test, index=test_df.index), pd.Series(forecast_df['Adj Close'], index=forecast_df.index)
+        feature_row = stream.values()
+        feature_row['Returns'] = returns
+        input_features = np.array([feature_row[col] for col in feature_cols], dtype=np.float64)
+        input_features[np.isnan(input_features)] = 0
+        input_scaled = (input_features - scaler.mean_) / scaler.scale_
 
-def forecast_with_rolling(best_model, train_df, test_df, feature_cols, scaler, mse_threshold=70, window_size=90, forecast_days=30):
-    test_predicted = []
-    rolling_forecast = []
+        predicted_close = np.exp(best_model.predict(input_scaled.reshape(1, -1)))
+        forecast[i] = predicted_close[0]
+
+        stream.push(float(predicted_close[0]))
+
+    return pd.Series(y_pred_test, index=test_df.index), pd.Series(forecast, index=pd.DatetimeIndex(forecast_dates), name='Adj Close')
+
+# Refit strategies for the rolling forecast: 'full' retrains from scratch on every refit, 'warm' adds
+# warm_rounds boosting rounds to the current booster and 'every_k' retrains at most every refit_every steps.
+# Warm refits keep the training scaler for the whole run, the existing trees were split on its scaling, and
+# rebuild the booster from scratch once it has grown by warm_rebuild_every refits.
+REFIT_STRATEGIES = ['full', 'warm', 'every_k']
+
+def _refit(best_model, X, y, refit, warm_rounds, max_rounds, stats):
+    start = time.perf_counter()
+    if refit == 'warm' and best_model.get_booster().num_boosted_rounds() + warm_rounds <= max_rounds:
+        # Boost the fitted booster in place, passing it back through fit() would copy every tree on each refit
+        booster = best_model.get_booster()
+        dtrain = xgb.DMatrix(X, label=y)
+        for _ in range(warm_rounds):
+            # Reseed per round, otherwise row and column subsampling depend on whatever else used the global RNG
+            booster.set_param('seed', booster.num_boosted_rounds())
+            booster.update(dtrain, booster.num_boosted_rounds())
+    else:
+        # A warm booster that reached max_rounds is rebuilt on the current window like a full refit
+        if refit == 'warm':
+            stats['rebuilds'] += 1
+        best_model.fit(X, y)
+    stats['refits'] += 1
+    stats['refit_seconds'] += time.perf_counter() - start
+
+def forecast_with_rolling(best_model, train_df, test_df, feature_cols, scaler, mse_threshold=70, window_size=90, forecast_days=30,
+                          refit='full', warm_rounds=5, warm_rebuild_every=10, refit_every=5, refit_stats=None, progress=None):
+    if refit not in REFIT_STRATEGIES:
+        raise ValueError(f"Unknown refit strategy: {refit}")
+    min_steps_between_refits = refit_every if refit == 'every_k' else 1
+    warm = refit == 'warm'
+    max_rounds = best_model.get_booster().num_boosted_rounds() + warm_rounds * warm_rebuild_every
+    fixed_scale = lambda rows: (rows - scaler.mean_) / scaler.scale_
+    stats = refit_stats if refit_stats is not None else {}
+    stats.update({'strategy': refit, 'refits': 0, 'rebuilds': 0, 'refit_seconds': 0.0})
     
     # Prediction on Test Set
-    for i in range(len(test_df)):
-        rolling_train_df = pd.concat([train_df, test_df.iloc[:i]])[-window_size:]
-        X_rolling_train = scaler.fit_transform(rolling_train_df[feature_cols].fillna(0))
-        y_rolling_train_log = np.log(rolling_train_df['Adj Close'])
-        
-        if i > 0 and mean_squared_error(test_df['Adj Close'].iloc[:i], test_predicted) > mse_threshold:
-            best_model.fit(X_rolling_train, y_rolling_train_log)
-        
-        X_test_point = scaler.transform(test_df[feature_cols].iloc[[i]].fillna(0))
-        y_pred_log_xgb = best_model.predict(X_test_point)
-        y_pred_test_point = np.exp(y_pred_log_xgb)[0]
-        
-        test_predicted.append(y_pred_test_point)
+    # The training window slides over one preallocated feature matrix, its scaler statistics and
+    # the running squared error are updated per step instead of recomputed over the whole prefix
+    history = pd.concat([train_df, test_df])
+    history_features = history[feature_cols].fillna(0).to_numpy(dtype=np.float64)
+    history_log = np.log(history['Adj Close'].to_numpy(dtype=np.float64))
+    y_test = test_df['Adj Close'].to_numpy(dtype=np.float64)
+    train_size = len(train_df)
+
+    window_scaler = RollingScaler(window_size, len(feature_cols))
+    window_scaler.extend(history_features[max(0, train_size - window_size):train_size])
+    squared_error_sum = 0.0
+    test_predicted = np.empty(len(test_df), dtype=np.float32)
+    steps_since_refit = min_steps_between_refits
+
+    def prepare_step(i):
+        # Slide the window onto test row i and retrain if the running MSE calls for it
+        nonlocal squared_error_sum, steps_since_refit
+        end = train_size + i
+        window_scaler.push(history_features[end - 1])
+        squared_error_sum += (y_test[i - 1] - float(test_predicted[i - 1])) ** 2
+
+        retrained = False
+        if squared_error_sum / i > mse_threshold and steps_since_refit >= min_steps_between_refits:
+            start = max(0, end - window_size)
+            X_rolling_train = (fixed_scale if warm else window_scaler.transform)(history_features[start:end])
+            _refit(best_model, X_rolling_train, history_log[start:end], refit, warm_rounds, max_rounds, stats)
+            steps_since_refit = 0
+            retrained = True
+        steps_since_refit += 1
+        return retrained
+
+    # The model only changes at retrain points, so the rows up to the next one are scaled and predicted in
+    # one call. Predictions made past a retrain are discarded, the span length adapts to how often that happens.
+    i = 0
+    span = 1
+    while i < len(test_df):
+        span_end = min(len(test_df), i + span)
+        if warm:
+            X_span = fixed_scale(history_features[train_size + i:train_size + span_end])
+        else:
+            staged_scaler = window_scaler.copy()
+            X_span = np.empty((span_end - i, len(feature_cols)))
+            for j in range(i, span_end):
+                if j > i:
+                    staged_scaler.push(history_features[train_size + j - 1])
+                X_span[j - i] = staged_scaler.transform(history_features[train_size + j])
+        span_predicted = np.exp(best_model.predict(X_span))
+
+        test_predicted[i] = span_predicted[0]
+        j = i + 1
+        retrained = False
+        while j < span_end:
+            retrained = prepare_step(j)
+            if retrained:
+                break
+            test_predicted[j] = span_predicted[j - i]
+            j += 1
+
+        span = max(1, span // 2) if retrained else min(512, span * 2)
+        if not retrained and j < len(test_df):
+            prepare_step(j)
+        i = j
     
     # 30-Day Forecast
-    current_input = test_df.copy()
+    if progress is not None:
+        progress('forecast')
+    # Forecast rows only carry Adj Close and Returns, their other features are zero in the training window
+    test_features = test_df[feature_cols].fillna(0).to_numpy(dtype=np.float64)
+    window_features = np.vstack([test_features, np.zeros((forecast_days, len(feature_cols)))])
+    window_closes = np.concatenate([test_df['Adj Close'].to_numpy(dtype=np.float64), np.empty(forecast_days)])
+    returns_col = feature_cols.index('Returns')
+
+    stream = FeatureStream(XGBOOST_FEATURES)
+    stream.extend(test_df['Adj Close'])
+    returns = test_df['Returns'].iloc[-1]
+    rolling_forecast = np.empty(forecast_days, dtype=np.float32)
+    forecast_dates = []
+    next_date = test_df.index[-1]
+
     for i in range(forecast_days):
-        rolling_train_df = current_input.iloc[-window_size:]
-        X_rolling_train = scaler.fit_transform(rolling_train_df[feature_cols].fillna(0))
-        y_rolling_train_log = np.log(rolling_train_df['Adj Close'])
-        
-        best_model.fit(X_rolling_train, y_rolling_train_log)
-        
-        last_close = current_input['Adj Close'].iloc[-1]
-        ema_9 = current_input['Adj Close'].ewm(span=9, adjust=False).mean().iloc[-1]
-        sma_5 = current_input['Adj Close'].rolling(window=5).mean().iloc[-1]
-        sma_10 = current_input['Adj Close'].rolling(window=10).mean().iloc[-1]
-        sma_15 = current_input['Adj Close'].rolling(window=15).mean().iloc[-1]
-        sma_30 = current_input['Adj Close'].rolling(window=30).mean().iloc[-1]
-        sma_50 = current_input['Adj Close'].rolling(window=50).mean().iloc[-1]
-        returns = current_input['Returns'].iloc[-1]
-        
-        feature_row = {
-            'EMA_9': ema_9, 'SMA_5': sma_5, 'SMA_10': sma_10,
-            'SMA_15': sma_15, 'SMA_30': sma_30, 'SMA_50': sma_50, 'Returns': returns
-        }
+        end = len(test_df) + i
+
+        # The scaler is only refit together with the model so both see the same window
+        if i % min_steps_between_refits == 0:
+            start = max(0, end - window_size)
+            X_rolling_train = fixed_scale(window_features[start:end]) if warm else scaler.fit_transform(window_features[start:end])
+            y_rolling_train_log = np.log(window_closes[start:end])
+            _refit(best_model, X_rolling_train, y_rolling_train_log, refit, warm_rounds, max_rounds, stats)
         
-        input_features = pd.DataFrame([feature_row], columns=feature_cols)
-        input_scaled = scaler.transform(input_features.fillna(0))
+        last_close = window_closes[end - 1]
+        feature_row = stream.values()
+        feature_row['Returns'] = returns
+        input_features = np.array([feature_row[col] for col in feature_cols], dtype=np.float64)
+        input_features[np.isnan(input_features)] = 0
+        input_scaled = fixed_scale(input_features.reshape(1, -1)) if warm else scaler.transform(input_features.reshape(1, -1))
         
         pred_log_xgb = best_model.predict(input_scaled)
         predicted_close = np.exp(pred_log_xgb)[0]
+        rolling_forecast[i] = predicted_close
         
-        rolling_forecast.append(predicted_close)
-        
-        next_date = current_input.index[-1] + pd.offsets.BDay(1)
-        new_row = pd.DataFrame({'Adj Close': [predicted_close], 'Returns': [(predicted_close - last_close) / last_close]}, index=[next_date])
-        current_input = pd.concat([current_input, new_row])
+        next_date = next_date + pd.offsets.BDay(1)
+        forecast_dates.append(next_date)
+        returns = (predicted_close - last_close) / last_close
+        window_closes[end] = predicted_close
+        window_features[end, returns_col] = returns
+        stream.push(float(predicted_close))
+
+    return pd.Series(test_predicted, index=test_df.index), pd.Series(rolling_forecast, index=pd.DatetimeIndex(forecast_dates))
+
+# Direct multi-horizon forecasting: one model takes the forecast origin's indicators, normalised by the price
+# at the origin, plus the horizon in business days, and predicts the log return from the origin to that horizon
+DIRECT_MAX_HORIZON = 90
+DIRECT_FEATURES = {name: (kind, window, 0) for name, (kind, window, _) in XGBOOST_FEATURES.items()}
+DIRECT_PARAMS = {
+    'n_estimators': 200,
+    'learning_rate': 0.05,
+    'max_depth': 3,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 50
+}
+
+def _direct_prices(train_df, test_df):
+    # Adj Close holds the next day's price, so the rows of both sets in order are the observed closes
+    return pd.concat([train_df, test_df])['Adj Close'].to_numpy(dtype=np.float64)
+
+def _direct_origin_features(prices):
+    features = compute_features(prices, DIRECT_FEATURES)
+    columns = []
+    for name, (kind, _, _) in DIRECT_FEATURES.items():
+        columns.append(features[name] if kind == 'returns' else features[name] / prices - 1)
+    return np.column_stack(columns)
+
+def _direct_inputs(origin_features, horizons):
+    # One row per (origin, horizon) pair, horizons varying fastest
+    X = np.repeat(origin_features, len(horizons), axis=0)
+    return np.column_stack([X, np.tile(horizons, len(origin_features))])
+
+def train_direct_model(train_df, test_df, max_horizon=DIRECT_MAX_HORIZON, params=DIRECT_PARAMS, n_jobs=-1):
+    prices = _direct_prices(train_df, test_df)[:len(train_df)]
+    origin_features = _direct_origin_features(prices)
+    horizons = np.arange(1, max_horizon + 1)
+    log_prices = np.log(prices)
+
+    # Origins whose indicators are warmed up, paired with every horizon that still lands inside the training set
+    origins = np.arange(len(prices))[~np.isnan(origin_features).any(axis=1)]
+    X = _direct_inputs(origin_features[origins], horizons)
+    targets = origins[:, None] + horizons[None, :]
+    valid = (targets < len(prices)).ravel()
+    y = ((log_prices[np.minimum(targets, len(prices) - 1)] - log_prices[origins, None]) / np.sqrt(horizons)).ravel()
+
+    direct_model = xgb.XGBRegressor(objective='reg:squarederror', n_jobs=_threads(n_jobs), **params)
+    direct_model.fit(X[valid], y[valid])
+    return direct_model
+
+def forecast_direct(direct_model, train_df, test_df, forecast_days=30):
+    prices = _direct_prices(train_df, test_df)
+    origin_features = _direct_origin_features(prices)
+    train_size = len(train_df)
+
+    # The test set is predicted one day ahead from each previous close, the forecast path at every horizon
+    # from the last close, both in a single predict call
+    test_origins = np.arange(train_size - 1, len(prices) - 1)
+    horizons = np.arange(1, forecast_days + 1)
+    X = np.vstack([_direct_inputs(origin_features[test_origins], [1]), _direct_inputs(origin_features[-1:], horizons)])
+    predicted = np.exp(direct_model.predict(X) * np.sqrt(X[:, -1]))
+
+    origin_prices = np.concatenate([prices[test_origins], np.repeat(prices[-1], forecast_days)])
+    predicted = (origin_prices * predicted).astype(np.float32)
+    forecast_dates = pd.DatetimeIndex([test_df.index[-1] + pd.offsets.BDay(h) for h in horizons])
 
-    return pd.Series(test_predicted, index=test_df.index), pd.Series(rolling_forecast, index=current_input.index[-forecast_days:])
\ No newline at end of file
+    return pd.Series(predicted[:len(test_df)], index=test_df.index), pd.Series(predicted[len(test_df):], index=forecast_dates, name='Adj Close')
@@ -0,0 +1,146 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error
+from sklearn.preprocessing import StandardScaler
+from benchmarks.synthetic import random_walk_prices
+from models.xgboost_model import prepare_features, predict_test_set, forecast_without_rolling, forecast_with_rolling
+
+# The forecasts as first written with pandas, recomputing every indicator over the whole history at each step.
+# The streaming versions in models.xgboost_model must give the same numbers.
+
+def baseline_forecast_without_rolling(best_model, test_df, scaler, feature_cols, y_test, y_pred_test, forecast_days=30):
+    forecast_input = test_df.copy()
+    forecast_df = pd.DataFrame(columns=test_df.columns)
+
+    for i in range(forecast_days):
+        last_date = forecast_input.index[-1]
+        next_date = last_date + pd.offsets.BDay(1)
+
+        ema_9 = forecast_input['Adj Close'].ewm(span=9, adjust=False).mean().iloc[-1]
+        sma_5 = forecast_input['Adj Close'].rolling(window=5).mean().iloc[-1]
+        sma_10 = forecast_input['Adj Close'].rolling(window=10).mean().iloc[-1]
+        sma_15 = forecast_input['Adj Close'].rolling(window=15).mean().iloc[-1]
+        sma_30 = forecast_input['Adj Close'].rolling(window=30).mean().iloc[-1]
+        sma_50 = forecast_input['Adj Close'].rolling(window=50).mean().iloc[-1]
+        returns = forecast_input['Returns'].iloc[-1]
+
+        feature_row = {
+            'EMA_9': ema_9, 'SMA_5': sma_5, 'SMA_10': sma_10,
+            'SMA_15': sma_15, 'SMA_30': sma_30, 'SMA_50': sma_50, 'Returns': returns
+        }
+
+        input_features = pd.DataFrame([feature_row], index=[next_date], columns=feature_cols)
+        input_scaled = scaler.transform(input_features.fillna(0))
+
+        pred_log_xgb = best_model.predict(input_scaled)
+        predicted_close = np.exp(pred_log_xgb)
+
+        feature_row['Adj Close'] = predicted_close
+        forecast_input = pd.concat([forecast_input, pd.DataFrame(feature_row, index=[next_date])])
+        if not pd.DataFrame(feature_row).dropna(how='all').empty:
+            forecast_df = pd.concat([forecast_df, pd.DataFrame(feature_row, index=[next_date])])
+
+    return pd.Series(y_pred_test, index=test_df.index), pd.Series(forecast_df['Adj Close'], index=forecast_df.index)
+
+def baseline_forecast_with_rolling(best_model, train_df, test_df, feature_cols, scaler, mse_threshold=70, window_size=90, forecast_days=30):
+    test_predicted = []
+    rolling_forecast = []
+
+    for i in range(len(test_df)):
+        rolling_train_df = pd.concat([train_df, test_df.iloc[:i]])[-window_size:]
+        X_rolling_train = scaler.fit_transform(rolling_train_df[feature_cols].fillna(0))
+        y_rolling_train_log = np.log(rolling_train_df['Adj Close'])
+
+        if i > 0 and mean_squared_error(test_df['Adj Close'].iloc[:i], test_predicted) > mse_threshold:
+            best_model.fit(X_rolling_train, y_rolling_train_log)
+
+        X_test_point = scaler.transform(test_df[feature_cols].iloc[[i]].fillna(0))
+        y_pred_log_xgb = best_model.predict(X_test_point)
+        y_pred_test_point = np.exp(y_pred_log_xgb)[0]
+
+        test_predicted.append(y_pred_test_point)
+
+    current_input = test_df.copy()
+    for i in range(forecast_days):
+        rolling_train_df = current_input.iloc[-window_size:]
+        X_rolling_train = scaler.fit_transform(rolling_train_df[feature_cols].fillna(0))
+        y_rolling_train_log = np.log(rolling_train_df['Adj Close'])
+
+        best_model.fit(X_rolling_train, y_rolling_train_log)
+
+        last_close = current_input['Adj Close'].iloc[-1]
+        ema_9 = current_input['Adj Close'].ewm(span=9, adjust=False).mean().iloc[-1]
+        sma_5 = current_input['Adj Close'].rolling(window=5).mean().iloc[-1]
+        sma_10 = current_input['Adj Close'].rolling(window=10).mean().iloc[-1]
+        sma_15 = current_input['Adj Close'].rolling(window=15).mean().iloc[-1]
+        sma_30 = current_input['Adj Close'].rolling(window=30).mean().iloc[-1]
+        sma_50 = current_input['Adj Close'].rolling(window=50).mean().iloc[-1]
+        returns = current_input['Returns'].iloc[-1]
+
+        feature_row = {
+            'EMA_9': ema_9, 'SMA_5': sma_5, 'SMA_10': sma_10,
+            'SMA_15': sma_15, 'SMA_30': sma_30, 'SMA_50': sma_50, 'Returns': returns
+        }
+
+        input_features = pd.DataFrame([feature_row], columns=feature_cols)
+        input_scaled = scaler.transform(input_features.fillna(0))
+
+        pred_log_xgb = best_model.predict(input_scaled)
+        predicted_close = np.exp(pred_log_xgb)[0]
+
+        rolling_forecast.append(predicted_close)
+
+        next_date = current_input.index[-1] + pd.offsets.BDay(1)
+        new_row = pd.DataFrame({'Adj Close': [predicted_close], 'Returns': [(predicted_close - last_close) / last_close]}, index=[next_date])
+        current_input = pd.concat([current_input, new_row])
+
+    return pd.Series(test_predicted, index=test_df.index), pd.Series(rolling_forecast, index=current_input.index[-forecast_days:])
+
+@pytest.fixture(scope='module')
+def trained():
+    # A small fixed model instead of a search, single-threaded so every fit gives the same trees
+    train_df, test_df, feature_cols = prepare_features(random_walk_prices(700, seed=7))
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(train_df[feature_cols].fillna(0))
+    model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=30, learning_rate=0.1, max_depth=3, n_jobs=1, random_state=0)
+    model.fit(X_train, np.log(train_df['Adj Close']))
+    return train_df, test_df, feature_cols, scaler, model
+
+def assert_same_series(actual, expected):
+    pd.testing.assert_index_equal(actual.index, expected.index, check_names=False)
+    np.testing.assert_array_equal(actual.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64))
+
+def test_recursive_forecast_matches_baseline(trained):
+    train_df, test_df, feature_cols, scaler, model = trained
+    y_test, y_pred_test = predict_test_set(model, scaler, test_df, feature_cols)
+    expected = baseline_forecast_without_rolling(copy.deepcopy(model), test_df, copy.deepcopy(scaler), feature_cols, y_test, y_pred_test, forecast_days=40)
+    actual = forecast_without_rolling(copy.deepcopy(model), test_df, copy.deepcopy(scaler), feature_cols, y_test, y_pred_test, forecast_days=40)
+    for actual_series, expected_series in zip(actual, expected):
+        assert_same_series(actual_series, expected_series)
+
+def rolling_matches_baseline(trained, mse_threshold):
+    train_df, test_df, feature_cols, scaler, model = trained
+    expected = baseline_forecast_with_rolling(copy.deepcopy(model), train_df, test_df, feature_cols, copy.deepcopy(scaler), mse_threshold=mse_threshold)
+    stats = {}
+    actual = forecast_with_rolling(copy.deepcopy(model), train_df, test_df, feature_cols, copy.deepcopy(scaler), mse_threshold=mse_threshold,
+                                   refit_stats=stats)
+    for actual_series, expected_series in zip(actual, expected):
+        assert_same_series(actual_series, expected_series)
+    # The forecast itself refits once per day
+    return stats['refits'] - 30
+
+def test_rolling_test_pass_without_retrains_matches_baseline(trained):
+    assert rolling_matches_baseline(trained, mse_threshold=1e9) == 0
+
+def test_rolling_test_pass_retraining_every_step_matches_baseline(trained):
+    _, test_df, _, _, _ = trained
+    assert rolling_matches_baseline(trained, mse_threshold=0) == len(test_df) - 1
+
+def test_rolling_test_pass_with_some_retrains_matches_baseline(trained):
+    # Retrains in the middle of the batched spans discard the predictions made past them
+    _, test_df, _, _, _ = trained
+    retrains = rolling_matches_baseline(trained, mse_threshold=2)
+    assert 0 < retrains < len(test_df) // 2
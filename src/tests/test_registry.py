@@ -0,0 +1,28 @@
+import pandas as pd
+from benchmarks.synthetic import random_walk_prices
+from models.registry import data_fingerprint, model_fingerprint
+
+def session(time):
+    return pd.Timestamp(f'2024-06-10 {time}', tz='America/New_York')
+
+def prices_through(last_day, live_close=None):
+    data = random_walk_prices(300)
+    data.index = pd.bdate_range(end=last_day, periods=len(data), name='Date')
+    if live_close is not None:
+        data.loc[data.index[-1], ['Close', 'Adj Close']] = live_close
+    return data
+
+def test_intraday_refreshes_keep_the_model_fingerprint():
+    morning, afternoon = prices_through('2024-06-10', 101.0), prices_through('2024-06-10', 103.5)
+    assert data_fingerprint(morning) != data_fingerprint(afternoon)
+    assert model_fingerprint(morning, session('10:15')) == model_fingerprint(afternoon, session('15:45'))
+    # Only today's row is left out
+    assert model_fingerprint(morning, session('10:15')) == data_fingerprint(morning.iloc[:-1])
+
+def test_closed_sessions_change_the_model_fingerprint():
+    morning, close = prices_through('2024-06-10', 101.0), prices_through('2024-06-10', 103.5)
+    assert model_fingerprint(close, session('16:05')) == data_fingerprint(close)
+    assert model_fingerprint(morning, session('10:15')) != model_fingerprint(close, session('16:05'))
+    # Before the open the last row is yesterday's finished session
+    yesterday = prices_through('2024-06-07')
+    assert model_fingerprint(yesterday, session('08:00')) == data_fingerprint(yesterday)
@@ -0,0 +1,49 @@
+import copy
+import numpy as np
+import pytest
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+from benchmarks.synthetic import random_walk_prices
+from models.xgboost_model import prepare_features, forecast_with_rolling
+
+def trained_model(seed, learning_rate=0.1, n_days=1200):
+    # A small fixed model instead of a search, single-threaded so every run fits the same trees
+    train_df, test_df, feature_cols = prepare_features(random_walk_prices(n_days, seed))
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(train_df[feature_cols].fillna(0))
+    model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100, learning_rate=learning_rate, max_depth=5,
+                             subsample=0.8, n_jobs=1, random_state=0)
+    model.fit(X_train, np.log(train_df['Adj Close']))
+    return train_df, test_df, feature_cols, scaler, model
+
+def rolling(refit, train_df, test_df, feature_cols, scaler, model, **kwargs):
+    stats = {}
+    test_predicted, forecast = forecast_with_rolling(copy.deepcopy(model), train_df, test_df, feature_cols, copy.deepcopy(scaler),
+                                                     refit=refit, refit_stats=stats, **kwargs)
+    mse = np.mean((test_df['Adj Close'].to_numpy() - test_predicted.to_numpy()) ** 2)
+    return mse, forecast, stats
+
+@pytest.mark.parametrize('seed, learning_rate', [(3, 0.1), (5, 0.1), (5, 0.01)])
+def test_warm_refit_tracks_full_refit(seed, learning_rate):
+    train_df, test_df, feature_cols, scaler, model = trained_model(seed, learning_rate)
+    full_mse, full_forecast, _ = rolling('full', train_df, test_df, feature_cols, scaler, model, forecast_days=90)
+    warm_mse, warm_forecast, stats = rolling('warm', train_df, test_df, feature_cols, scaler, model, forecast_days=90)
+
+    assert stats['refits'] > 0 and stats['rebuilds'] > 0
+    assert warm_mse < 1.5 * full_mse
+    # The forecast stays around the last prices instead of drifting off with the scaling
+    last_close = test_df['Adj Close'].iloc[-1]
+    assert np.all(np.abs(warm_forecast.to_numpy() / last_close - 1) < 0.5)
+    assert np.abs(warm_forecast.iloc[-1] / full_forecast.iloc[-1] - 1) < 0.25
+
+def test_warm_refit_caps_booster_growth():
+    train_df, test_df, feature_cols, scaler, model = trained_model(5)
+    fitted = copy.deepcopy(model)
+    forecast_with_rolling(fitted, train_df, test_df, feature_cols, copy.deepcopy(scaler), forecast_days=30,
+                          refit='warm', warm_rounds=5, warm_rebuild_every=10)
+    assert fitted.get_booster().num_boosted_rounds() <= 100 + 5 * 10
+
+def test_unknown_refit_strategy():
+    train_df, test_df, feature_cols, scaler, model = trained_model(0, n_days=400)
+    with pytest.raises(ValueError):
+        forecast_with_rolling(model, train_df, test_df, feature_cols, scaler, refit='partial')